@@ -1,68 +1,234 @@
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PySide6.QtCore import QObject, Signal
+from shiboken6 import isValid
 from google import genai
 import os, json
+from shared.http_session import create_session
 
 class ApiClient:
-    def __init__(self, settings):
+    def __init__(self, settings, timeout=5, pool_size=8, retries=2):
         self.settings = settings
         self.base_url = f"{settings.server_ip}:{settings.server_port}"
         self.headers = {"Authorization": settings.token}
+        # One pooled session for every call, the tabs poll several endpoints
+        # per second and each would otherwise open a new connection.
+        self.timeout = timeout
+        self.http = create_session(pool_size, retries)
 
     def login(self, username, password):
         url = f"{self.base_url}/login"
-        return requests.post(url, json={"username": username, "password": password}, timeout=5)
+        return self.http.post(url, json={"username": username, "password": password}, timeout=self.timeout)
 
     def get_accounts(self):
         url = f"{self.base_url}/app?type=accounts"
-        return requests.get(url, headers=self.headers, timeout=5)
+        return self.http.get(url, headers=self.headers, timeout=self.timeout)
 
     def add_account(self, data):
         url = f"{self.base_url}/app?type=accounts"
-        return requests.post(url, json=data, headers=self.headers, timeout=5)
+        return self.http.post(url, json=data, headers=self.headers, timeout=self.timeout)
 
     def delete_account(self, id):
         url = f"{self.base_url}/app?type=accounts&id={id}"
-        return requests.delete(url, headers=self.headers, timeout=5)
+        return self.http.delete(url, headers=self.headers, timeout=self.timeout)
 
     def update_account(self, data):
         url = f"{self.base_url}/app?type=accounts"
-        return requests.put(url, json=data, headers=self.headers, timeout=5)
+        return self.http.put(url, json=data, headers=self.headers, timeout=self.timeout)
 
     def get_zones(self):
         url = f"{self.base_url}/app?type=zones"
-        return requests.get(url, headers=self.headers, timeout=5)
+        return self.http.get(url, headers=self.headers, timeout=self.timeout)
 
     def add_zone(self, data):
         url = f"{self.base_url}/app?type=zones"
-        return requests.post(url, json=data, headers=self.headers, timeout=5)
+        return self.http.post(url, json=data, headers=self.headers, timeout=self.timeout)
 
     def delete_zone(self, id):
         url = f"{self.base_url}/app?type=zones&id={id}"
-        return requests.delete(url, headers=self.headers, timeout=5)
+        return self.http.delete(url, headers=self.headers, timeout=self.timeout)
 
     def update_zone(self, data):
         url = f"{self.base_url}/app?type=zones"
-        return requests.put(url, json=data, headers=self.headers, timeout=5)
+        return self.http.put(url, json=data, headers=self.headers, timeout=self.timeout)
 
     def get_monitors(self):
         url = f"{self.base_url}/app?type=monitors"
-        return requests.get(url, headers=self.headers, timeout=5)
+        return self.http.get(url, headers=self.headers, timeout=self.timeout)
 
     def add_monitor(self, data):
         url = f"{self.base_url}/app?type=monitors"
-        return requests.post(url, json=data, headers=self.headers, timeout=5)
+        return self.http.post(url, json=data, headers=self.headers, timeout=self.timeout)
 
     def delete_monitor(self, id):
         url = f"{self.base_url}/app?type=monitors&id={id}"
-        return requests.delete(url, headers=self.headers, timeout=5)
+        return self.http.delete(url, headers=self.headers, timeout=self.timeout)
 
     def update_monitor(self, data):
         url = f"{self.base_url}/app?type=monitors"
-        return requests.put(url, json=data, headers=self.headers, timeout=5)
+        return self.http.put(url, json=data, headers=self.headers, timeout=self.timeout)
     
+    def get_thumbnail(self, id, etag=None):
+        url = f"{self.base_url}/monitors/{id}/thumbnail"
+        headers = dict(self.headers)
+        if etag:
+            headers["If-None-Match"] = f'"{etag}"'
+        return self.http.get(url, headers=headers, timeout=self.timeout)
+
     def reset_monitor_counter(self, name, key):
         data = {"action": "reset", "name": name, "key": key}
-        return requests.post(f"{self.base_url}/app?type=monitors", headers=self.headers, json=data, timeout=5)
+        return self.http.post(f"{self.base_url}/app?type=monitors", headers=self.headers, json=data, timeout=self.timeout)
+
+    def get_history(self, kind, id, start, end, resolution="auto"):
+        url = f"{self.base_url}/history"
+        params = {"type": kind, "id": id, "start": start, "end": end, "resolution": resolution}
+        return self.http.get(url, params=params, headers=self.headers, timeout=self.timeout)
+
+    def subscribe(self, on_event):
+        subscription = EventSubscription(f"{self.base_url}/stream", self.headers, on_event)
+        subscription.start()
+        return subscription
+
+# Runs ApiClient calls (or any function) on a small thread pool and hands the
+# results back on the GUI thread, so a slow or unreachable server never
+# freezes the window. Calls share a key when they fetch the same resource:
+# while one is in flight, further calls with that key are merged into a
+# single follow-up request that starts once it returns, so overlapping
+# timer refreshes cost at most one extra request and never see stale data.
+class AsyncApiClient(QObject):
+    _completed = Signal(object, object, object)
+
+    def __init__(self, api_client, max_workers=4, parent=None):
+        super().__init__(parent)
+        self.api_client = api_client
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="api")
+        # key -> callbacks of the running request / of the merged follow-up
+        self.in_flight = {}
+        self.queued = {}
+        self._completed.connect(self._deliver)
+
+    def call(self, method, *args, key=None, on_result=None, on_error=None):
+        # Runs self.api_client.<method>(*args); key defaults to the call itself.
+        return self.submit(key or (method, *args), getattr(self.api_client, method), *args,
+                           on_result=on_result, on_error=on_error)
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None):
+        # on_result(result) or on_error(exception) run later on the GUI thread.
+        # Returns False when the call was merged into a pending one.
+        callbacks = (on_result, on_error)
+        if key in self.in_flight:
+            self.queued.setdefault(key, (fn, args, []))[2].append(callbacks)
+            return False
+        self._start(key, fn, args, [callbacks])
+        return True
+
+    def _start(self, key, fn, args, callbacks):
+        self.in_flight[key] = callbacks
+        self.executor.submit(self._run, key, fn, args)
+
+    def _run(self, key, fn, args):
+        try:
+            result, error = fn(*args), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            self._completed.emit(key, result, error)
+        except RuntimeError:
+            # The client was deleted with its window while this was running.
+            pass
+
+    def _deliver(self, key, result, error):
+        callbacks = self.in_flight.pop(key, [])
+        if key in self.queued:
+            fn, args, queued = self.queued.pop(key)
+            self._start(key, fn, args, queued)
+        for on_result, on_error in callbacks:
+            callback = on_result if error is None else on_error
+            if callback is None:
+                if error is not None:
+                    print(f"Request {key} failed: {error}")
+                continue
+            # Skip widgets that were closed while the request was running.
+            owner = getattr(callback, "__self__", None)
+            if isinstance(owner, QObject) and not isValid(owner):
+                continue
+            callback(result if error is None else error)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# Reads the server's /stream Server-Sent Events on a background thread and
+# hands each (event, data) pair to on_event. A synthetic "stream" event with
+# {"connected": bool} reports when the feed goes up or down.
+class EventSubscription:
+    def __init__(self, url, headers, on_event):
+        self.url = url
+        self.headers = dict(headers)
+        self.on_event = on_event
+        self._stopped = threading.Event()
+        self._response = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        try:
+            self._listen()
+        except RuntimeError:
+            # The receiving Qt object was deleted while an event was in flight.
+            self._stopped.set()
+
+    def _listen(self):
+        backoff = 1.0
+        while not self._stopped.is_set():
+            try:
+                with requests.get(self.url, headers=self.headers, stream=True, timeout=(5, 30)) as response:
+                    self._response = response
+                    if response.status_code != 200:
+                        # Older server or no permission, callers keep polling.
+                        self.on_event("stream", {"connected": False, "status_code": response.status_code})
+                        return
+                    self.on_event("stream", {"connected": True})
+                    backoff = 1.0
+                    self._read_events(response)
+            except (requests.RequestException, AttributeError, ValueError):
+                pass
+            finally:
+                self._response = None
+            if self._stopped.is_set():
+                return
+            self.on_event("stream", {"connected": False})
+            self._stopped.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _read_events(self, response):
+        event_name = "message"
+        data_lines = []
+        for line in response.iter_lines(decode_unicode=True):
+            if self._stopped.is_set():
+                return
+            if not line:
+                if data_lines:
+                    self.on_event(event_name, json.loads("\n".join(data_lines)))
+                event_name = "message"
+                data_lines = []
+            elif line.startswith(":"):
+                continue
+            elif line.startswith("event:"):
+                event_name = line[6:].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[5:].strip())
     
 class GoogleGenAI:
     def __init__(self):
@@ -1,11 +1,15 @@
+import os
 import sys
+# shared/ at the repository root holds the modules the apps have in common.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 from PySide6.QtWidgets import QApplication, QMainWindow, QStackedWidget, QTabWidget, QPushButton, QMessageBox, QTabBar
 from PySide6.QtCore import QTimer, Signal
 from PySide6.QtGui import QFont
 from settings import ClientSettings, save_client_data, load_client_data
 from login import LoginWindow
 from tabs import AccountTab, ZoneTab, MonitorTab, SettingTab
-from api import ApiClient
+from api import ApiClient, AsyncApiClient
+from shared.pixmap_cache import PixmapCache
 import requests
 
 class MainWindow(QMainWindow):
@@ -17,17 +21,20 @@ class MainWindow(QMainWindow):
         self.settings = settings
         self.pin = pin 
         self.api_client = ApiClient(settings)
+        # Refreshes run off the GUI thread, see AsyncApiClient.
+        self.async_api = AsyncApiClient(self.api_client, parent=self)
+        self.pixmap_cache = PixmapCache(parent=self)
         self.setWindowTitle("SmartFlow Park Client")
         self.setMinimumSize(900, 700)
 
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
 
-        self.account_tab = AccountTab(settings, self.api_client, self.tabs)
+        self.account_tab = AccountTab(settings, self.api_client, self.async_api, self.tabs)
         self.account_tab.setEnabled("home" in settings.permissions)
-        self.zone_tab = ZoneTab(settings, self.api_client, self.tabs)
+        self.zone_tab = ZoneTab(settings, self.api_client, self.async_api, self.tabs)
         self.zone_tab.setEnabled("zone" in settings.permissions)
-        self.monitor_tab = MonitorTab(settings, self.api_client, self.tabs)
+        self.monitor_tab = MonitorTab(settings, self.api_client, self.async_api, self.pixmap_cache, self.tabs)
         self.monitor_tab.setEnabled("monitor" in settings.permissions)
         self.setting_tab = SettingTab(settings, self.tabs)
         self.setting_tab.apply_settings.connect(self.restart_application)
@@ -108,23 +115,39 @@ class MainWindow(QMainWindow):
             current_tab.tab_activated()
 
     def check_session(self):
-        try:
-            resp = self.api_client.get_accounts()
-            if resp.status_code != 200:
-                QMessageBox.information(self, "Notification", "Session expired or no permission!")
-                self.session_expired.emit()
-                self.session_timer.stop()
-        except requests.RequestException:
-            QMessageBox.information(self, "Notification", "Unable to connect to server!")
+        # Shares the "accounts" key with the Account tab's refresh.
+        self.async_api.call("get_accounts", key="accounts", on_result=self.on_session_checked,
+                            on_error=self.on_session_error)
+
+    def on_session_checked(self, resp):
+        if resp.status_code != 200 and self.session_timer.isActive():
+            QMessageBox.information(self, "Notification", "Session expired or no permission!")
             self.session_expired.emit()
             self.session_timer.stop()
 
+    def on_session_error(self, error):
+        if not isinstance(error, requests.RequestException) or not self.session_timer.isActive():
+            return
+        QMessageBox.information(self, "Notification", "Unable to connect to server!")
+        self.session_expired.emit()
+        self.session_timer.stop()
+
     def logout(self):
         self.settings.token = ""
         save_client_data(self.settings, self.pin)
         self.session_expired.emit()
         self.session_timer.stop()
 
+    def shutdown(self):
+        self.session_timer.stop()
+        # Closes the tabs' /stream subscriptions before the widgets go away.
+        for i in range(self.tabs.count()):
+            tab = self.tabs.widget(i)
+            if hasattr(tab, 'tab_deactivated'):
+                tab.tab_deactivated()
+        self.async_api.shutdown()
+        self.pixmap_cache.shutdown()
+
     def restart_application(self):
         save_client_data(self.settings, self.pin)
         from settings import save_ui_settings
@@ -135,6 +158,7 @@ class MainWindow(QMainWindow):
         self.parent().addWidget(new_main_window)
         self.parent().setCurrentWidget(new_main_window)
         self.parent().removeWidget(self)
+        self.shutdown()
         self.deleteLater()
 
 class ClientApp(QStackedWidget):
@@ -157,6 +181,7 @@ class ClientApp(QStackedWidget):
         QMessageBox.information(self, "Notification", "Session expired. Please log in again!")
         self.setCurrentWidget(self.login_window)
         if self.main_window:
+            self.main_window.shutdown()
             self.removeWidget(self.main_window)
             self.main_window = None
 
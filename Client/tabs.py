@@ -1,5 +1,4 @@
 import secrets
-import base64
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
     QPushButton, QFormLayout, QDialog, QComboBox, QListWidget, QListWidgetItem,
@@ -7,19 +6,18 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, Signal, QTimer
 from shiboken6 import isValid 
-from PySide6.QtGui import QPixmap, QImage, QColor
+from PySide6.QtGui import QColor
 import requests
-import cv2
-import numpy as np
 from api import GoogleGenAI
 import markdown
 from functools import partial
 
 class AccountTab(QWidget):
-    def __init__(self, settings, api_client, parent_tab_widget):
+    def __init__(self, settings, api_client, async_api, parent_tab_widget):
         super().__init__()
         self.settings = settings
         self.api_client = api_client
+        self.async_api = async_api
         self.parent_tab_widget = parent_tab_widget
         self.layout = QVBoxLayout()
         self.layout.setContentsMargins(10, 10, 10, 10)
@@ -58,27 +56,30 @@ class AccountTab(QWidget):
         self.load_data()
 
     def load_data(self):
-        try:
-            resp = self.api_client.get_accounts()
-            if resp.status_code == 200:
-                accounts = resp.json().get("data", [])
-                self.table.clearContents()
-                self.table.setRowCount(0)
-                self.table.setRowCount(len(accounts))
-                for i, acc in enumerate(accounts):
-                    self.table.setItem(i, 0, QTableWidgetItem(str(acc.get("id", ""))))
-                    self.table.setItem(i, 1, QTableWidgetItem(acc.get("username", "")))
-                    self.table.setItem(i, 2, QTableWidgetItem(acc.get("password", "")))
-                    self.table.setItem(i, 3, QTableWidgetItem(str(acc.get("permissions", ""))))
-                    self.table.setItem(i, 4, QTableWidgetItem(acc.get("status", "")))
-                header = self.table.horizontalHeader()
-                for col in range(self.table.columnCount()):
-                    header.setSectionResizeMode(col, QHeaderView.Stretch)
-            elif resp.status_code == 403:
-                QMessageBox.warning(self, "Error", "No permission to view Account tab")
-                self.setEnabled(False)
-        except requests.RequestException as e:
-            QMessageBox.warning(self, "Error", f"Connection failed: {str(e)}")
+        self.async_api.call("get_accounts", key="accounts", on_result=self.show_accounts,
+                            on_error=self.show_connection_error)
+
+    def show_accounts(self, resp):
+        if resp.status_code == 200:
+            accounts = resp.json().get("data", [])
+            self.table.clearContents()
+            self.table.setRowCount(0)
+            self.table.setRowCount(len(accounts))
+            for i, acc in enumerate(accounts):
+                self.table.setItem(i, 0, QTableWidgetItem(str(acc.get("id", ""))))
+                self.table.setItem(i, 1, QTableWidgetItem(acc.get("username", "")))
+                self.table.setItem(i, 2, QTableWidgetItem(acc.get("password", "")))
+                self.table.setItem(i, 3, QTableWidgetItem(str(acc.get("permissions", ""))))
+                self.table.setItem(i, 4, QTableWidgetItem(acc.get("status", "")))
+            header = self.table.horizontalHeader()
+            for col in range(self.table.columnCount()):
+                header.setSectionResizeMode(col, QHeaderView.Stretch)
+        elif resp.status_code == 403 and self.isEnabled():
+            QMessageBox.warning(self, "Error", "No permission to view Account tab")
+            self.setEnabled(False)
+
+    def show_connection_error(self, error):
+        QMessageBox.warning(self, "Error", f"Connection failed: {str(error)}")
 
     def filter_table(self):
         search_text = self.search_bar.text().lower()
@@ -221,11 +222,20 @@ class AccountTab(QWidget):
             QMessageBox.warning(self, "Error", f"Connection failed: {str(e)}")
 
 class ZoneTab(QWidget):
-    def __init__(self, settings, api_client, parent_tab_widget):
+    stream_event = Signal(str, object)
+    POLL_INTERVAL = 4000
+    # While the /stream feed is up, polling only backs it up.
+    STREAM_REFRESH_INTERVAL = 60000
+
+    def __init__(self, settings, api_client, async_api, parent_tab_widget):
         super().__init__()
         self.settings = settings
         self.api_client = api_client
+        self.async_api = async_api
         self.parent_tab_widget = parent_tab_widget
+        self.subscription = None
+        self.stream_connected = False
+        self.stream_event.connect(self.on_stream_event)
         self.layout = QVBoxLayout()
         self.layout.setContentsMargins(10, 10, 10, 10)
 
@@ -274,68 +284,105 @@ class ZoneTab(QWidget):
         self.load_data()
 
     def tab_activated(self):
-        self.timer.start(4000)
+        self.timer.start(self.POLL_INTERVAL)
+        if self.subscription is None:
+            self.subscription = self.api_client.subscribe(self.stream_event.emit)
 
     def tab_deactivated(self):
         self.timer.stop()
+        if self.subscription is not None:
+            self.subscription.stop()
+            self.subscription = None
+        self.stream_connected = False
+
+    def on_stream_event(self, event, data):
+        if event == "stream":
+            self.stream_connected = data.get("connected", False)
+            if self.timer.isActive():
+                self.timer.start(self.STREAM_REFRESH_INTERVAL if self.stream_connected else self.POLL_INTERVAL)
+        elif event == "zone":
+            from settings import load_zone_thresholds
+            for i in range(self.table.rowCount()):
+                item = self.table.item(i, 0)
+                if item and item.text() == str(data.get("id", "")):
+                    self.set_zone_row(i, data, load_zone_thresholds())
+                    return
+            self.load_data()
+        elif event == "zone_removed":
+            self.load_data()
+
+    def set_zone_row(self, i, zone, zone_thresholds):
+        self.table.setItem(i, 0, QTableWidgetItem(str(zone.get("id", ""))))
+        self.table.setItem(i, 1, QTableWidgetItem(zone.get("name", "")))
+        self.table.setItem(i, 2, QTableWidgetItem(zone.get("mode", "max")))
+        self.table.setItem(i, 3, QTableWidgetItem(str(zone.get("people_count", 0))))
+        maxzone = zone_thresholds.get(str(zone.get("id", "")), 10)
+        self.table.setItem(i, 4, QTableWidgetItem(str(maxzone)))
+
+        count = zone.get("people_count", 0)
+        if count < maxzone * 0.6:
+            color = QColor("green")
+        elif count <= maxzone * 0.8:
+            color = QColor("yellow")
+        else:
+            color = QColor("red")
+        for col in range(5):
+            item = self.table.item(i, col)
+            if item:
+                item.setBackground(color)
+        return count, maxzone
 
     def load_data(self):
+        self.async_api.call("get_zones", key="zones", on_result=self.show_zones, on_error=self.show_connection_error)
+
+    def show_zones(self, resp):
         from settings import load_zone_thresholds
-        zone_thresholds = load_zone_thresholds()
-        try:
-            resp = self.api_client.get_zones()
-            if resp.status_code == 200:
-                zones = resp.json().get("data", [])
-                if not isinstance(zones, list):
-                    QMessageBox.warning(self, "Error", "Invalid data format from server!")
-                    return
+        if resp.status_code == 200:
+            zones = resp.json().get("data", [])
+            if not isinstance(zones, list):
+                QMessageBox.warning(self, "Error", "Invalid data format from server!")
+                return
+            zone_thresholds = load_zone_thresholds()
 
-                selected_row = self.table.currentRow()
-                selected_id = self.table.item(selected_row, 0).text() if selected_row >= 0 else None
-
-                self.table.clearContents()
-                self.table.setRowCount(0)
-                self.table.setRowCount(len(zones))
-
-                for i, zone in enumerate(zones):
-                    if not isinstance(zone, dict):
-                        continue
-
-                    self.table.setItem(i, 0, QTableWidgetItem(str(zone.get("id", ""))))
-                    self.table.setItem(i, 1, QTableWidgetItem(zone.get("name", "")))
-                    self.table.setItem(i, 2, QTableWidgetItem(zone.get("mode", "max")))
-                    self.table.setItem(i, 3, QTableWidgetItem(str(zone.get("people_count", 0))))
-                    maxzone = zone_thresholds.get(str(zone.get("id", "")), 10)
-                    self.table.setItem(i, 4, QTableWidgetItem(str(maxzone)))
-
-                    count = zone.get("people_count", 0)
-                    if count < maxzone * 0.6:
-                        color = QColor("green")
-                    elif count <= maxzone * 0.8:
-                        color = QColor("yellow")
-                    else:
-                        color = QColor("red")
-                    for col in range(5):
-                        item = self.table.item(i, col)
-                        if item:
-                            item.setBackground(color)
-
-                    if maxzone * 0.6 <= count <= maxzone * 0.8:
-                        warning = self.gen_ai.warn_people_management(zone, zone_thresholds)
-                        pos = self.table.viewport().mapToGlobal(self.table.visualItemRect(self.table.item(i, 0)).bottomLeft())
-                        QToolTip.showText(pos, warning, self.table)
-
-                    if selected_id and str(zone.get("id", "")) == selected_id:
-                        self.table.selectRow(i)
-
-                self.table.resizeColumnsToContents()
-                self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-
-            elif resp.status_code == 403:
-                QMessageBox.warning(self, "Error", "No permission to view Zone tab")
-                self.setEnabled(False)
-        except requests.RequestException as e:
-            QMessageBox.warning(self, "Error", f"Connection failed: {str(e)}")
+            selected_row = self.table.currentRow()
+            selected_id = self.table.item(selected_row, 0).text() if selected_row >= 0 else None
+
+            self.table.clearContents()
+            self.table.setRowCount(0)
+            self.table.setRowCount(len(zones))
+
+            for i, zone in enumerate(zones):
+                if not isinstance(zone, dict):
+                    continue
+
+                count, maxzone = self.set_zone_row(i, zone, zone_thresholds)
+
+                if maxzone * 0.6 <= count <= maxzone * 0.8:
+                    # The AI warning is a remote call too, the tooltip shows once it's back.
+                    self.async_api.submit(("zone_warning", zone.get("id")), self.gen_ai.warn_people_management,
+                                          zone, zone_thresholds,
+                                          on_result=partial(self.show_zone_warning, str(zone.get("id", ""))))
+
+                if selected_id and str(zone.get("id", "")) == selected_id:
+                    self.table.selectRow(i)
+
+            self.table.resizeColumnsToContents()
+            self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+
+        elif resp.status_code == 403 and self.isEnabled():
+            QMessageBox.warning(self, "Error", "No permission to view Zone tab")
+            self.setEnabled(False)
+
+    def show_zone_warning(self, zone_id, warning):
+        for i in range(self.table.rowCount()):
+            item = self.table.item(i, 0)
+            if item and item.text() == zone_id:
+                pos = self.table.viewport().mapToGlobal(self.table.visualItemRect(item).bottomLeft())
+                QToolTip.showText(pos, warning, self.table)
+                return
+
+    def show_connection_error(self, error):
+        QMessageBox.warning(self, "Error", f"Connection failed: {str(error)}")
 
     def filter_table(self):
         search_text = self.search_bar.text().lower()
@@ -588,9 +635,10 @@ class MonitorBox(QFrame):
     clicked = Signal(bool)
     doubleClicked = Signal(bool)
     
-    def __init__(self, monitor_data: dict, parent=None):
+    def __init__(self, monitor_data: dict, pixmap_cache, parent=None):
         super().__init__(parent)
         self.monitor_data = monitor_data
+        self.pixmap_cache = pixmap_cache
         self.default_stylesheet = (
             "QFrame { border: 2px solid #555; background-color: #333; padding: 10px; border-radius: 10px; }"
             " QLabel { color: white; font-size: 14px; }"
@@ -605,7 +653,8 @@ class MonitorBox(QFrame):
 
         self.image_label = QLabel()
         self.image_label.setFixedSize(180, 150)
-        self.image_label.setStyleSheet("background-color: black; border-radius: 8px;")
+        self.image_style = "background-color: black; border-radius: 8px;"
+        self.image_label.setStyleSheet(self.image_style)
         layout.addWidget(self.image_label)
 
         info_layout = QVBoxLayout()
@@ -636,39 +685,64 @@ class MonitorBox(QFrame):
         layout.setStretch(0, 2)
         layout.setStretch(1, 3)
         self.setLayout(layout)
-        
-        self.update_image()
+
+        # Thumbnails are decoded only while the box is in (or near) the
+        # scroll viewport, see MonitorTab.render_visible.
+        self.in_view = False
+        self.shown_image = None
+        self.show_placeholder("No image available")
+
+    def update_live(self, live_data: dict):
+        self.monitor_data.update(live_data)
+        self.update_labels()
 
     def update_data(self, new_data: dict):
         self.monitor_data = new_data
-        self.name_value.setText(new_data.get('name', 'Unknown'))
-        self.count_value.setText(str(new_data.get('people_count', 0)))
+        self.update_labels()
         self.update_image()
 
+    def update_labels(self):
+        name = self.monitor_data.get('name', 'Unknown')
+        count = str(self.monitor_data.get('people_count', 0))
+        if self.name_value.text() != name:
+            self.name_value.setText(name)
+        if self.count_value.text() != count:
+            self.count_value.setText(count)
+
+    def show_placeholder(self, text):
+        self.image_label.setText(text)
+        self.image_label.setStyleSheet("background-color: black; border: 1px solid white; color: white;")
+
     def update_image(self):
-        image_b64 = self.monitor_data.get("image")
-        if image_b64:
-            try:
-                image_data = base64.b64decode(image_b64)
-                nparray = np.frombuffer(image_data, np.uint8)
-                frame = cv2.imdecode(nparray, cv2.IMREAD_COLOR)
-                if frame is not None:
-                    frame = cv2.flip(frame, -1)
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    height, width, channel = frame.shape
-                    bytes_per_line = 3 * width
-                    qimg = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
-                    pixmap = QPixmap.fromImage(qimg)
-                    self.image_label.setPixmap(pixmap.scaled(self.image_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                else:
-                    self.image_label.setText("Unable to load image")
-                    self.image_label.setStyleSheet("background-color: black; border: 1px solid white; color: white;")
-            except Exception as e:
-                self.image_label.setText(f"Error: {str(e)}")
-                self.image_label.setStyleSheet("background-color: black; border: 1px solid white; color: white;")
+        image_data = self.monitor_data.get("image")
+        # The thumbnail cache hands out the same bytes object until the image changes.
+        if not self.in_view or image_data is self.shown_image:
+            return
+        self.shown_image = image_data
+        if image_data:
+            pixmap = self.pixmap_cache.request(image_data, self.image_label.size(), partial(self.show_pixmap, image_data))
+            if pixmap is not None:
+                self.show_pixmap(image_data, pixmap)
         else:
-            self.image_label.setText("No image available")
-            self.image_label.setStyleSheet("background-color: black; border: 1px solid white; color: white;")
+            self.show_placeholder("No image available")
+
+    def show_pixmap(self, image_data, pixmap):
+        # A newer image may have been requested while this one was decoding.
+        if image_data is not self.shown_image:
+            return
+        if pixmap is None:
+            self.show_placeholder("Unable to load image")
+            return
+        if self.image_label.styleSheet() != self.image_style:
+            self.image_label.setStyleSheet(self.image_style)
+        self.image_label.setPixmap(pixmap)
+
+    def release_image(self):
+        # Drops the label's pixmap while the box is out of view; the cache
+        # usually still has it when the box comes back.
+        if self.shown_image:
+            self.shown_image = None
+            self.show_placeholder("No image available")
 
     def mousePressEvent(self, event):
         if self.isVisible():
@@ -694,11 +768,21 @@ class MonitorBox(QFrame):
 # MonitorTab Class
 #########################################
 class MonitorTab(QWidget):
-    def __init__(self, settings, api_client, parent_tab_widget):
+    stream_event = Signal(str, object)
+    POLL_INTERVAL = 2000
+    # While the /stream feed is up (it also carries thumbnail hashes), polling only backs it up.
+    STREAM_REFRESH_INTERVAL = 30000
+
+    def __init__(self, settings, api_client, async_api, pixmap_cache, parent_tab_widget):
         super().__init__()
         self.settings = settings
         self.api_client = api_client
+        self.async_api = async_api
+        self.pixmap_cache = pixmap_cache
         self.parent_tab_widget = parent_tab_widget
+        self.subscription = None
+        self.stream_connected = False
+        self.stream_event.connect(self.on_stream_event)
         self.layout = QVBoxLayout()
         self.layout.setContentsMargins(10, 10, 10, 10)
 
@@ -716,6 +800,7 @@ class MonitorTab(QWidget):
         self.grid_layout.setSpacing(15)
         self.content_widget.setLayout(self.grid_layout)
         self.scroll.setWidget(self.content_widget)
+        self.scroll.verticalScrollBar().valueChanged.connect(self.render_visible)
         self.layout.addWidget(self.scroll)
 
         # Create buttons
@@ -724,7 +809,10 @@ class MonitorTab(QWidget):
 
         self.selected_monitor = None
         self.selected_monitor_box = None
-        self.monitor_boxes = []
+        # monitor id -> MonitorBox, in server order
+        self.monitor_boxes = {}
+        # monitor id -> (image hash, image bytes)
+        self.thumbnails = {}
 
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.load_data)
@@ -752,61 +840,133 @@ class MonitorTab(QWidget):
         self.layout.addLayout(btn_layout)
 
     def load_data(self):
-        try:
-            resp = self.api_client.get_monitors()
-            if resp.status_code == 200:
-                monitors = resp.json().get("data", [])
-                selected_id = self.selected_monitor["id"] if self.selected_monitor else None
-
-                while self.grid_layout.count():
-                    item = self.grid_layout.takeAt(0)
-                    if item.widget():
-                        item.widget().deleteLater()
-                self.monitor_boxes.clear()
-
-                row, col = 0, 0
-                for monitor in monitors:
-                    box = MonitorBox(monitor, self)
-                    box.clicked.connect(partial(self.on_box_clicked, monitor, box))
-                    box.doubleClicked.connect(partial(self.on_box_double_clicked, monitor))
-                    box.setContextMenuPolicy(Qt.CustomContextMenu)
-                    box.customContextMenuRequested.connect(partial(self.on_box_context_menu, monitor, box))
-                    self.grid_layout.addWidget(box, row, col)
-                    self.monitor_boxes.append(box)
-
-                    col += 1
-                    if col == 2:
-                        col = 0
-                        row += 1
-
-                if selected_id:
-                    for box in self.monitor_boxes:
-                        if box.monitor_data.get("id") == selected_id:
-                            self.select_monitor(box.monitor_data, box)
-                            break
-                    else:
-                        self.selected_monitor = None
-                        self.selected_monitor_box = None
-
-            elif resp.status_code == 403:
-                QMessageBox.warning(self, "Error", "No permission to view Monitor tab")
-                self.setEnabled(False)
-        except requests.RequestException as e:
-            QMessageBox.warning(self, "Error", f"Connection failed: {str(e)}")
-
-    def on_box_clicked(self, monitor, box, checked):
-        self.select_monitor(monitor, box)
-
-    def on_box_double_clicked(self, monitor, checked):
-        self.show_monitor_detail(monitor=monitor)
-
-    def on_box_context_menu(self, monitor, box, pos):
-        self.show_context_menu(pos, monitor, box)
+        self.async_api.call("get_monitors", key="monitors", on_result=self.show_monitors,
+                            on_error=self.show_connection_error)
+
+    def show_monitors(self, resp):
+        if resp.status_code == 200:
+            monitors = resp.json().get("data", [])
+            selected_id = self.selected_monitor["id"] if self.selected_monitor else None
+
+            # Boxes are kept by monitor id and only updated, moved, added or
+            # removed as the listing changes.
+            self.content_widget.setUpdatesEnabled(False)
+            boxes = {}
+            for index, monitor in enumerate(monitors):
+                monitor_id = monitor.get("id")
+                monitor["image"] = self.fetch_thumbnail(monitor)
+                box = self.monitor_boxes.pop(monitor_id, None)
+                if box is None or not isValid(box):
+                    box = self.create_box(monitor)
+                else:
+                    box.update_data(monitor)
+                boxes[monitor_id] = box
+
+                position = divmod(index, 2)
+                layout_index = self.grid_layout.indexOf(box)
+                if layout_index < 0 or self.grid_layout.getItemPosition(layout_index)[:2] != position:
+                    self.grid_layout.removeWidget(box)
+                    self.grid_layout.addWidget(box, *position)
+
+            for monitor_id, box in self.monitor_boxes.items():
+                self.thumbnails.pop(monitor_id, None)
+                if isValid(box):
+                    self.grid_layout.removeWidget(box)
+                    box.deleteLater()
+            self.monitor_boxes = boxes
+            self.filter_monitors()
+            self.content_widget.setUpdatesEnabled(True)
+
+            if selected_id is not None:
+                box = self.monitor_boxes.get(selected_id)
+                if box is None:
+                    self.selected_monitor = None
+                    self.selected_monitor_box = None
+                elif box is self.selected_monitor_box:
+                    self.selected_monitor = box.monitor_data
+                else:
+                    self.select_monitor(box.monitor_data, box)
+
+        elif resp.status_code == 403 and self.isEnabled():
+            QMessageBox.warning(self, "Error", "No permission to view Monitor tab")
+            self.setEnabled(False)
+
+    def show_connection_error(self, error):
+        QMessageBox.warning(self, "Error", f"Connection failed: {str(error)}")
+
+    def fetch_thumbnail(self, monitor):
+        # The listing only carries the image hash. Returns the cached bytes
+        # right away; when the hash changed, the new image is fetched in the
+        # background and shown by on_thumbnail.
+        monitor_id = monitor.get("id")
+        image_hash = monitor.get("image_hash")
+        cached = self.thumbnails.get(monitor_id)
+        if not image_hash:
+            self.thumbnails.pop(monitor_id, None)
+            return None
+        if cached and cached[0] == image_hash:
+            return cached[1]
+        self.async_api.call("get_thumbnail", monitor_id, cached[0] if cached else None,
+                            key=("thumbnail", monitor_id), on_result=partial(self.on_thumbnail, monitor_id, image_hash))
+        return cached[1] if cached else None
+
+    def on_thumbnail(self, monitor_id, image_hash, resp):
+        if resp.status_code == 200:
+            self.thumbnails[monitor_id] = (resp.headers.get("ETag", "").strip('"') or image_hash, resp.content)
+        elif resp.status_code != 304:
+            self.thumbnails.pop(monitor_id, None)
+        cached = self.thumbnails.get(monitor_id)
+        box = self.monitor_boxes.get(monitor_id)
+        if box is not None and isValid(box):
+            box.monitor_data["image"] = cached[1] if cached else None
+            box.update_image()
+
+    def create_box(self, monitor):
+        box = MonitorBox(monitor, self.pixmap_cache, self.content_widget)
+        # Boxes outlive the listing they were created from, so the handlers
+        # read the box's current data.
+        box.clicked.connect(partial(self.on_box_clicked, box))
+        box.doubleClicked.connect(partial(self.on_box_double_clicked, box))
+        box.setContextMenuPolicy(Qt.CustomContextMenu)
+        box.customContextMenuRequested.connect(partial(self.on_box_context_menu, box))
+        return box
+
+    def on_box_clicked(self, box, checked):
+        self.select_monitor(box.monitor_data, box)
+
+    def on_box_double_clicked(self, box, checked):
+        self.show_monitor_detail(monitor=box.monitor_data)
+
+    def on_box_context_menu(self, box, pos):
+        self.show_context_menu(pos, box.monitor_data, box)
 
     def filter_monitors(self):
         search_text = self.search_bar.text().lower()
-        for box in self.monitor_boxes:
-            box.setVisible(search_text in box.monitor_data.get("name", "").lower())
+        for box in self.monitor_boxes.values():
+            visible = search_text in box.monitor_data.get("name", "").lower()
+            if box.isVisibleTo(self.content_widget) != visible:
+                box.setVisible(visible)
+        self.grid_layout.activate()
+        self.render_visible()
+
+    def render_visible(self):
+        # Only boxes within a box height of the viewport show thumbnails; the
+        # others release theirs and catch up once they're scrolled into view.
+        area = self.scroll.viewport().rect().translated(-self.content_widget.pos()).adjusted(0, -200, 0, 200)
+        for box in self.monitor_boxes.values():
+            box.in_view = box.isVisibleTo(self.content_widget) and box.geometry().intersects(area)
+            if box.in_view:
+                box.update_image()
+            else:
+                box.release_image()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.render_visible()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.render_visible()
 
     def show_context_menu(self, pos, monitor, box):
         menu = QMenu(self)
@@ -944,10 +1104,35 @@ class MonitorTab(QWidget):
         dialog.exec()
 
     def tab_activated(self):
-        self.timer.start(2000)
+        self.timer.start(self.POLL_INTERVAL)
+        if self.subscription is None:
+            self.subscription = self.api_client.subscribe(self.stream_event.emit)
 
     def tab_deactivated(self):
         self.timer.stop()
+        if self.subscription is not None:
+            self.subscription.stop()
+            self.subscription = None
+        self.stream_connected = False
+
+    def on_stream_event(self, event, data):
+        if event == "stream":
+            self.stream_connected = data.get("connected", False)
+            if self.timer.isActive():
+                self.timer.start(self.STREAM_REFRESH_INTERVAL if self.stream_connected else self.POLL_INTERVAL)
+        elif event == "monitor":
+            box = self.monitor_boxes.get(data.get("id"))
+            if box is not None and isValid(box):
+                image_changed = box.monitor_data.get("image_hash") != data.get("image_hash")
+                if image_changed:
+                    data["image"] = self.fetch_thumbnail(data)
+                box.update_live(data)
+                if image_changed:
+                    box.update_image()
+                return
+            self.load_data()
+        elif event == "monitor_removed":
+            self.load_data()
 
 class SettingTab(QWidget):
     apply_settings = Signal()
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+
+class ZoneState:
+    def __init__(self, zone):
+        self.id = zone.get("id")
+        self.name = zone.get("name", "")
+        self.mode = zone.get("mode", "max")
+        self.monitors = list(zone.get("monitors", []))
+        self.counts = {}
+        self.total = 0
+        self._max = None
+        self._min = None
+
+    def set(self, client_id, count):
+        old = self.counts.get(client_id)
+        if old == count:
+            return
+        if old is not None:
+            self.total -= old
+        self.counts[client_id] = count
+        self.total += count
+        # Extremes are only recomputed when the value holding them moves away.
+        if self._max is not None and (count >= self._max or old != self._max):
+            self._max = max(self._max, count)
+        else:
+            self._max = None
+        if self._min is not None and (count <= self._min or old != self._min):
+            self._min = min(self._min, count)
+        else:
+            self._min = None
+
+    def discard(self, client_id):
+        old = self.counts.pop(client_id, None)
+        if old is None:
+            return
+        self.total -= old
+        if old == self._max:
+            self._max = None
+        if old == self._min:
+            self._min = None
+
+    def people_count(self):
+        if not self.counts:
+            return 0
+        if self.mode == "max":
+            if self._max is None:
+                self._max = max(self.counts.values())
+            return self._max
+        if self.mode == "min":
+            if self._min is None:
+                self._min = min(self.counts.values())
+            return self._min
+        if self.mode == "avg":
+            return int(round(self.total / len(self.counts)))
+        if self.mode == "sum":
+            return self.total
+        return 0
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "mode": self.mode,
+            "monitors": list(self.monitors),
+            "people_count": self.people_count()
+        }
+
+class ZoneAggregator:
+    def __init__(self, threshold=15.0):
+        self.threshold = threshold
+        self.zones = OrderedDict()
+        self.monitor_by_name = {}
+        self.zones_by_monitor = {}
+        # client_id -> (people_count, last_seen), least recently seen first
+        self.live = OrderedDict()
+        self.configured = False
+
+    def configure(self, zones, monitors):
+        self.zones = OrderedDict((zone.get("id"), ZoneState(zone)) for zone in zones)
+        self.monitor_by_name = {}
+        for monitor in sorted(monitors, key=lambda m: m.get("id") or 0):
+            # Zones refer to monitors by name, the first monitor with a name wins.
+            self.monitor_by_name.setdefault(monitor["name"], f"{monitor['key']}_{monitor['name']}")
+        self.zones_by_monitor = {}
+        for zone in self.zones.values():
+            for name in zone.monitors:
+                client_id = self.monitor_by_name.get(name)
+                if client_id is not None:
+                    self.zones_by_monitor.setdefault(client_id, set()).add(zone.id)
+        for client_id, (count, _) in self.live.items():
+            for zone_id in self.zones_by_monitor.get(client_id, ()):
+                self.zones[zone_id].set(client_id, count)
+        self.configured = True
+
+    def update(self, client_id, count, last_seen, now):
+        if now - last_seen > self.threshold:
+            # An expired client only comes back with a fresh heartbeat.
+            self.remove(client_id)
+            return
+        previous = self.live.get(client_id)
+        self.live[client_id] = (count, last_seen)
+        # Re-syncs without a new heartbeat keep their place, so the order
+        # stays by last_seen and expire() can stop at the first fresh client.
+        if previous is None or previous[1] != last_seen:
+            self.live.move_to_end(client_id)
+        for zone_id in self.zones_by_monitor.get(client_id, ()):
+            self.zones[zone_id].set(client_id, count)
+
+    def remove(self, client_id):
+        if self.live.pop(client_id, None) is None:
+            return
+        for zone_id in self.zones_by_monitor.get(client_id, ()):
+            self.zones[zone_id].discard(client_id)
+
+    def expire(self, now):
+        while self.live:
+            client_id, (_, last_seen) = next(iter(self.live.items()))
+            if now - last_seen <= self.threshold:
+                break
+            self.remove(client_id)
+
+    def snapshot(self, now):
+        self.expire(now)
+        return [zone.as_dict() for zone in self.zones.values()]
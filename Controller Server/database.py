@@ -0,0 +1,97 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+class Database:
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_name, timeout=30.0, cached_statements=256, pool_size=8):
+        self.db_name = db_name
+        self.timeout = timeout
+        # sqlite3 keeps compiled statements per connection, so keeping the
+        # connection open turns the repeated queries into prepared statements.
+        self.cached_statements = cached_statements
+        # Connections are checked out per call and returned to a bounded pool,
+        # so they are reused both on uWSGI's fixed threads and under Flask's
+        # threaded server, which starts a new thread for every request.
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._pid = os.getpid()
+
+    @classmethod
+    def get(cls, db_name):
+        # One shared instance per file so every manager reuses the same
+        # connection pool.
+        path = os.path.abspath(db_name)
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(db_name)
+            return cls._instances[path]
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.timeout * 1000)}')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        # Connections must not survive a fork (uWSGI workers), start a new pool per process.
+        if self._pid != os.getpid():
+            self._pool = queue.LifoQueue(maxsize=self.pool_size)
+            self._pid = os.getpid()
+        pool = self._pool
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            with conn:
+                yield conn.cursor()
+
+    def execute(self, sql, params=()):
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor
+
+    def executemany(self, sql, seq_of_params):
+        with self.transaction() as cursor:
+            cursor.executemany(sql, seq_of_params)
+            return cursor
+
+    def fetchall(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def fetchone(self, sql, params=()):
+        with self.connection() as conn:
+            cursor = conn.execute(sql, params)
+            row = cursor.fetchone()
+            cursor.close()
+            return row
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
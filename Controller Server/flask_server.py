@@ -1,48 +1,111 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+import json
 import time
 import secrets
 from settings import RandomGenerator
-import sqlite3
+from live_state import create_live_state
+from history import OccupancyHistory
+from shared import wire
+from thumbnails import image_content_type
 
-connected_clients = {}
+# Connected monitors and login tokens. In-process by default; set
+# SMARTFLOW_LIVE_STATE to a live_state server address to share them
+# between uWSGI workers.
+live_state = create_live_state()
 default_key = RandomGenerator.generate_key(16)
 default_name = RandomGenerator.generate_name(8)
 client_id = f"{default_key}_{default_name}"
-connected_clients[client_id] = {
+live_state.set_client(client_id, {
     'key': default_key,
     'name': default_name,
     'people_count': 0,
     'image': None,
     "last_request": None,
     "delay": 0
-}
+})
+
+# Zone totals are maintained incrementally by the live state, which needs
+# to be told about zone membership whenever zones or monitors change.
+def sync_zone_aggregates(settings_manager, monitor_manager):
+    live_state.configure_zones(settings_manager.get_all_zones(), monitor_manager.get_monitor_credentials())
 
 class FlaskServer:
+    THRESHOLD = 15.0
+    MAX_BATCH_SIZE = 500
+    MAX_THUMBNAIL_SIZE = 512 * 1024
+    # /stream re-checks at least this often so OK -> ERROR transitions go out
+    # without any heartbeat, and at most this often under heavy ingest.
+    STREAM_INTERVAL = 1.0
+    STREAM_MIN_INTERVAL = 0.2
+    # /stream is closed after this many seconds and re-opened by the client
+    # with a fresh snapshot, so an idle dashboard can't hold a worker thread forever.
+    STREAM_LIFETIME = 600
+    # A channel stream is closed after this many seconds and re-opened by the
+    # monitor, so a dead peer can't hold a worker thread forever.
+    CHANNEL_LIFETIME = 300
+    CHANNEL_KEEPALIVE = 10
+
     def __init__(self, settings_manager, monitor_manager):
         self.settings_manager = settings_manager
         self.monitor_manager = monitor_manager
         self.app = Flask(__name__)
-        self.tokens = {}  # {token: {"username": "...", "permissions": [...], "expiry": timestamp}}
+        self.history = OccupancyHistory(settings_manager.db_name)
+        sync_zone_aggregates(settings_manager, monitor_manager)
         self.register_routes()
 
     def _is_valid_client(self, key, name):
-        for monitor in self.monitor_manager.get_all_monitors():
-            if monitor.get("key") == key and monitor.get("name") == name:
-                return True
-        return False
+        return self.monitor_manager.is_valid_credential(key, name)
+
+    def _monitor_snapshot(self, now):
+        real_time_monitors = []
+        clients = live_state.all_clients()
+        for monitor in self.monitor_manager.get_monitor_credentials():
+            client_id = f"{monitor.get('key', '')}_{monitor.get('name', '')}"
+            client = clients.get(client_id, {})
+            status = "OK" if client and (now - client.get("last_request", 0)) <= self.THRESHOLD else "ERROR"
+            real_time_monitor = {
+                "id": monitor.get("id"),
+                "name": monitor.get("name", ""),
+                "key": monitor.get("key", ""),  
+                "people_count": client.get("people_count", 0) if status == "OK" else 0,
+                "status": status,
+                "delay": client.get("delay", 0) if status == "OK" else 0,
+                "counters": (client.get("counters") or {}) if status == "OK" else {},
+                # The image itself is served by /monitors/<id>/thumbnail.
+                "image_hash": client.get("image_hash") if status == "OK" else None
+            }
+            real_time_monitors.append(real_time_monitor)
+        return real_time_monitors
+
+    def _zone_snapshot(self, now):
+        if not live_state.zones_configured():
+            sync_zone_aggregates(self.settings_manager, self.monitor_manager)
+        return live_state.zone_snapshot(now)
+
+    def _history_samples(self):
+        now = time.time()
+        samples = [(f"monitor:{monitor['id']}", monitor["people_count"])
+                   for monitor in self._monitor_snapshot(now) if monitor["status"] == "OK"]
+        samples.extend((f"zone:{zone['id']}", zone["people_count"]) for zone in self._zone_snapshot(now))
+        return samples
 
     def _check_auth(self, token, required_permission=None):
-        if token not in self.tokens:
+        user_info = live_state.get_token(token)
+        if user_info is None:
             return False, "Invalid or expired token"
-        user_info = self.tokens[token]
         if time.time() > user_info["expiry"]:
-            del self.tokens[token]
+            live_state.remove_token(token)
             return False, "Token has expired"
         if required_permission and required_permission not in user_info["permissions"]:
             return False, f"Permission '{required_permission}' required"
         return True, user_info["username"]
 
     def register_routes(self):
+        @self.app.before_request
+        def start_history():
+            if not self.history.is_running():
+                self.history.start(self._history_samples)
+
         @self.app.route('/login', methods=['POST'])
         def login():
             data = request.get_json(silent=True)
@@ -54,11 +117,11 @@ class FlaskServer:
                 if account["username"] == username and account["password"] == password:
                     token = secrets.token_hex(16)
                     permissions = account.get("permissions", [])
-                    self.tokens[token] = {
+                    live_state.set_token(token, {
                         "username": username,
                         "permissions": permissions,
                         "expiry": time.time() + 28800 
-                    }
+                    })
                     # Trả về token và permissions
                     return jsonify({"status": "OK", "token": token, "permissions": permissions}), 200
             return jsonify({"status": "ERROR", "message": "Invalid credentials"}), 401
@@ -84,59 +147,13 @@ class FlaskServer:
                     return jsonify({"status": "ERROR", "message": message}), 403
         
                 now = time.time()
-                THRESHOLD = 15.0
         
                 if request.method == 'GET':
                     if data_type == 'monitors':
-                        real_time_monitors = []
-                        for monitor in self.monitor_manager.get_all_monitors():
-                            client_id = f"{monitor.get('key', '')}_{monitor.get('name', '')}"
-                            client = connected_clients.get(client_id, {})
-                            status = "OK" if client and (now - client.get("last_request", 0)) <= THRESHOLD else "ERROR"
-                            real_time_monitor = {
-                                "id": monitor.get("id"),
-                                "name": monitor.get("name", ""),
-                                "key": monitor.get("key", ""),  
-                                "people_count": client.get("people_count", 0) if status == "OK" else 0,
-                                "image": client.get("image", None) if status == "OK" else "",
-                                "status": status,
-                                "delay": client.get("delay", 0) if status == "OK" else 0
-                            }
-                            real_time_monitors.append(real_time_monitor)
-                        return jsonify({"status": "OK", "data": real_time_monitors}), 200
+                        return jsonify({"status": "OK", "data": self._monitor_snapshot(now)}), 200
         
                     elif data_type == 'zones':
-                        real_time_zones = []
-                        for zone in self.settings_manager.get_all_zones():
-                            counts = []
-                            for mname in zone.get("monitors", []):
-                                for monitor in self.monitor_manager.get_all_monitors():
-                                    if monitor["name"] == mname:
-                                        client_id = f"{monitor['key']}_{monitor['name']}"
-                                        client = connected_clients.get(client_id)
-                                        if client and (now - client.get("last_request", 0)) <= THRESHOLD:
-                                            counts.append(client.get("people_count", 0))
-                                        break
-                            people_count = 0
-                            if counts:
-                                mode = zone.get("mode", "max")
-                                if mode == "max":
-                                    people_count = max(counts)
-                                elif mode == "min":
-                                    people_count = min(counts)
-                                elif mode == "avg":
-                                    people_count = int(round(sum(counts) / len(counts)))
-                                elif mode == "sum":
-                                    people_count = sum(counts)
-                            real_time_zone = {
-                                "id": zone.get("id"),
-                                "name": zone.get("name", ""),
-                                "mode": zone.get("mode", "max"),
-                                "monitors": zone.get("monitors", []),
-                                "people_count": people_count
-                            }
-                            real_time_zones.append(real_time_zone)
-                        return jsonify({"status": "OK", "data": real_time_zones}), 200
+                        return jsonify({"status": "OK", "data": self._zone_snapshot(now)}), 200
         
                     elif data_type == 'accounts':
                         return jsonify({"status": "OK", "data": self.settings_manager.get_all_accounts()}), 200
@@ -153,18 +170,30 @@ class FlaskServer:
                             if not key or not name:
                                 return jsonify({"status": "ERROR", "message": "Missing key or name"}), 400
                             client_id = f"{key}_{name}"
-                            if client_id in connected_clients:
-                                connected_clients[client_id]["people_count"] = 0 
-                                connected_clients[client_id]["reset_counter"] = True
+                            if live_state.request_reset(client_id):
                                 return jsonify({"status": "OK", "message": "People counter reset"}), 200
                             else:
                                 return jsonify({"status": "ERROR", "message": "Monitor not connected"}), 404
+
+                        if data.get("action") == "boundary":
+                            key = data.get("key")
+                            name = data.get("name")
+                            boundary = data.get("boundary")
+                            if not key or not name:
+                                return jsonify({"status": "ERROR", "message": "Missing key or name"}), 400
+                            if not isinstance(boundary, list) or len(boundary) not in (0, 2):
+                                return jsonify({"status": "ERROR", "message": "Boundary must be two points or empty"}), 400
+                            if live_state.push_command(f"{key}_{name}", {"action": "Set Boundary", "boundary": boundary}):
+                                return jsonify({"status": "OK", "message": "Boundary sent"}), 200
+                            return jsonify({"status": "ERROR", "message": "Monitor has no open channel"}), 404
         
                         self.monitor_manager.add_monitor(data)
+                        sync_zone_aggregates(self.settings_manager, self.monitor_manager)
                         return jsonify({"status": "OK", "message": "Monitor added"}), 201
         
                     elif data_type == 'zones':
                         self.settings_manager.add_zone(data)
+                        sync_zone_aggregates(self.settings_manager, self.monitor_manager)
                         return jsonify({"status": "OK", "message": "Zone added"}), 201
         
                     elif data_type == 'accounts':
@@ -179,9 +208,11 @@ class FlaskServer:
                     id = data.pop('id')
                     if data_type == 'monitors':
                         self.monitor_manager.update_monitor(id, data)  
+                        sync_zone_aggregates(self.settings_manager, self.monitor_manager)
                         return jsonify({"status": "OK", "message": "Monitor updated"}), 200
                     elif data_type == 'zones':
                         self.settings_manager.update_zone(id, data)
+                        sync_zone_aggregates(self.settings_manager, self.monitor_manager)
                         return jsonify({"status": "OK", "message": "Zone updated"}), 200
                     elif data_type == 'accounts':
                         if 'ip' in data or 'port' in data:
@@ -200,36 +231,26 @@ class FlaskServer:
         
                     if data_type == 'monitors':
                         try:
-                            with sqlite3.connect(self.monitor_manager.db_name) as conn:
-                                cursor = conn.cursor()
-                                cursor.execute('DELETE FROM monitors WHERE id = ?', (id,))
-                                if cursor.rowcount == 0:
-                                    return jsonify({"status": "ERROR", "message": "Monitor not found"}), 404
-                                conn.commit()
+                            if not self.monitor_manager.delete_monitor(id):
+                                return jsonify({"status": "ERROR", "message": "Monitor not found"}), 404
+                            sync_zone_aggregates(self.settings_manager, self.monitor_manager)
                         except Exception as e:
                             return jsonify({"status": "ERROR", "message": "Database error", "error": str(e)}), 500
                         return jsonify({"status": "OK", "message": "Monitor deleted"}), 200
         
                     elif data_type == 'zones':
                         try:
-                            with sqlite3.connect(self.settings_manager.db_name) as conn:
-                                cursor = conn.cursor()
-                                cursor.execute('DELETE FROM zones WHERE id = ?', (id,))
-                                if cursor.rowcount == 0:
-                                    return jsonify({"status": "ERROR", "message": "Zone not found"}), 404
-                                conn.commit()
+                            if not self.settings_manager.delete_zone(id):
+                                return jsonify({"status": "ERROR", "message": "Zone not found"}), 404
+                            sync_zone_aggregates(self.settings_manager, self.monitor_manager)
                         except Exception as e:
                             return jsonify({"status": "ERROR", "message": "Database error", "error": str(e)}), 500
                         return jsonify({"status": "OK", "message": "Zone deleted"}), 200
         
                     elif data_type == 'accounts':
                         try:
-                            with sqlite3.connect(self.settings_manager.db_name) as conn:
-                                cursor = conn.cursor()
-                                cursor.execute('DELETE FROM accounts WHERE id = ?', (id,))
-                                if cursor.rowcount == 0:
-                                    return jsonify({"status": "ERROR", "message": "Account not found"}), 404
-                                conn.commit()
+                            if not self.settings_manager.delete_account(id):
+                                return jsonify({"status": "ERROR", "message": "Account not found"}), 404
                         except Exception as e:
                             return jsonify({"status": "ERROR", "message": "Database error", "error": str(e)}), 500
                         return jsonify({"status": "OK", "message": "Account deleted"}), 200
@@ -241,6 +262,110 @@ class FlaskServer:
                 # Bắt các ngoại lệ không lường trước được và trả về lỗi chung
                 return jsonify({"status": "ERROR", "message": "Internal server error", "error": str(e)}), 500
 
+        @self.app.route('/history', methods=['GET'])
+        def get_history():
+            token = request.headers.get('Authorization')
+            if not token:
+                return jsonify({"status": "ERROR", "message": "Authorization token required"}), 401
+            series_type = request.args.get('type')
+            if series_type not in ('monitor', 'zone'):
+                return jsonify({"status": "ERROR", "message": "Invalid type parameter"}), 400
+            is_valid, message = self._check_auth(token, series_type)
+            if not is_valid:
+                return jsonify({"status": "ERROR", "message": message}), 403
+            resolution = request.args.get('resolution', 'auto')
+            if resolution != 'auto' and resolution not in OccupancyHistory.RESOLUTIONS:
+                return jsonify({"status": "ERROR", "message": "Invalid resolution"}), 400
+            try:
+                series_id = int(request.args.get('id', ''))
+                end = float(request.args.get('end', time.time()))
+                start = float(request.args.get('start', end - 3600))
+            except ValueError:
+                return jsonify({"status": "ERROR", "message": "Invalid id, start or end"}), 400
+            if start > end:
+                return jsonify({"status": "ERROR", "message": "start must not be after end"}), 400
+            resolution, points = self.history.query(f"{series_type}:{series_id}", start, end, resolution)
+            return jsonify({"status": "OK", "resolution": resolution, "data": points}), 200
+
+        @self.app.route('/monitors/<int:monitor_id>/thumbnail', methods=['GET'])
+        def get_thumbnail(monitor_id):
+            token = request.headers.get('Authorization') or request.args.get('token')
+            if not token:
+                return jsonify({"status": "ERROR", "message": "Authorization token required"}), 401
+            is_valid, message = self._check_auth(token, 'monitor')
+            if not is_valid:
+                return jsonify({"status": "ERROR", "message": message}), 403
+            for monitor in self.monitor_manager.get_monitor_credentials():
+                if monitor["id"] == monitor_id:
+                    break
+            else:
+                return jsonify({"status": "ERROR", "message": "Monitor not found"}), 404
+            client = live_state.get_client(f"{monitor['key']}_{monitor['name']}")
+            if not client or time.time() - (client.get("last_request") or 0) > self.THRESHOLD:
+                return jsonify({"status": "ERROR", "message": "No image available"}), 404
+            thumbnail = live_state.get_thumbnail(f"{monitor['key']}_{monitor['name']}")
+            if thumbnail is None:
+                return jsonify({"status": "ERROR", "message": "No image available"}), 404
+            headers = {"ETag": f'"{thumbnail["hash"]}"', "Cache-Control": "private, no-cache"}
+            if request.if_none_match.contains(thumbnail["hash"]):
+                return Response(status=304, headers=headers)
+            return Response(thumbnail["data"], mimetype=thumbnail["content_type"], headers=headers)
+
+        @self.app.route('/stream', methods=['GET'])
+        def stream_updates():
+            token = request.headers.get('Authorization') or request.args.get('token')
+            if not token:
+                return jsonify({"status": "ERROR", "message": "Authorization token required"}), 401
+            is_valid, message = self._check_auth(token)
+            if not is_valid:
+                return jsonify({"status": "ERROR", "message": message}), 403
+            want_monitors = self._check_auth(token, 'monitor')[0]
+            want_zones = self._check_auth(token, 'zone')[0]
+            if not want_monitors and not want_zones:
+                return jsonify({"status": "ERROR", "message": "Permission 'monitor' or 'zone' required"}), 403
+
+            def event(name, data):
+                return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+            def stream():
+                # Only changed people counts / statuses are sent. The first pass
+                # diffs against nothing, so it doubles as the initial snapshot.
+                sent_monitors = {}
+                sent_zones = {}
+                version = None
+                deadline = time.time() + self.STREAM_LIFETIME
+                while time.time() < deadline and self._check_auth(token)[0]:
+                    now = time.time()
+                    chunks = []
+                    if want_monitors:
+                        current = {}
+                        for monitor in self._monitor_snapshot(now):
+                            current[monitor["id"]] = monitor
+                            previous = sent_monitors.get(monitor["id"])
+                            if previous is None or any(previous[field] != monitor[field]
+                                                       for field in ("name", "people_count", "status", "counters", "image_hash")):
+                                chunks.append(event("monitor", monitor))
+                        for monitor_id in sent_monitors.keys() - current.keys():
+                            chunks.append(event("monitor_removed", {"id": monitor_id}))
+                        sent_monitors = current
+                    if want_zones:
+                        current = {}
+                        for zone in self._zone_snapshot(now):
+                            current[zone["id"]] = zone
+                            if sent_zones.get(zone["id"]) != zone:
+                                chunks.append(event("zone", zone))
+                        for zone_id in sent_zones.keys() - current.keys():
+                            chunks.append(event("zone_removed", {"id": zone_id}))
+                        sent_zones = current
+                    # A comment line doubles as a keepalive so dead clients are noticed.
+                    yield "".join(chunks) if chunks else ": keepalive\n\n"
+                    version = live_state.wait_for_change(version if version is not None else live_state.version(),
+                                                         self.STREAM_INTERVAL)
+                    time.sleep(self.STREAM_MIN_INTERVAL)
+
+            return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
         @self.app.route('/connect', methods=['POST'])
         def connect():
             data = request.get_json(silent=True)
@@ -251,15 +376,63 @@ class FlaskServer:
             if not self._is_valid_client(key, name):
                 return jsonify({"status": "ERROR", "message": "Invalid key or name"}), 403
             client_id = f"{key}_{name}"
-            connected_clients[client_id] = {
+            session = live_state.connect_client(client_id, {
                 'key': key,
                 'name': name,
                 'people_count': 0,
                 'image': None,
                 "last_request": time.time(),
                 "delay": 0
-            }
-            return jsonify({"status": "OK", "key": key, "name": name}), 200
+            })
+            return jsonify({"status": "OK", "key": key, "name": name,
+                            "session": session["session"], "epoch": session["epoch"]}), 200
+
+        @self.app.route('/channel', methods=['GET'])
+        def open_channel():
+            session = request.args.get('session')
+            client_id = live_state.get_session_client(session) if session else None
+            if not client_id:
+                return jsonify({"status": "ERROR", "message": "Invalid session"}), 403
+
+            def stream():
+                # Commands are only accepted while a channel is attached.
+                live_state.attach_channel(client_id)
+                try:
+                    deadline = time.time() + self.CHANNEL_LIFETIME
+                    yield json.dumps({"action": "Hello"}) + "\n"
+                    while time.time() < deadline:
+                        commands = live_state.wait_commands(client_id, session, self.CHANNEL_KEEPALIVE)
+                        if commands is None:
+                            break
+                        if not commands:
+                            yield "\n"
+                        for command in commands:
+                            yield json.dumps(command) + "\n"
+                finally:
+                    live_state.detach_channel(client_id)
+
+            return Response(stream_with_context(stream()), mimetype='application/x-ndjson',
+                            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+        @self.app.route('/channel', methods=['POST'])
+        def push_channel():
+            if request.mimetype == wire.MIMETYPE:
+                try:
+                    session, epoch, count, delta, image = wire.decode_count(request.get_data())
+                except ValueError as e:
+                    return jsonify({"status": "ERROR", "message": str(e)}), 400
+                result = live_state.apply_delta(session, delta, count, epoch, image, time.time())
+                if result is None:
+                    return jsonify({"status": "ERROR", "message": "Invalid session"}), 403
+                return Response(wire.encode_reply(result["epoch"]), mimetype=wire.MIMETYPE)
+            data = request.get_json(silent=True)
+            if not data or 's' not in data:
+                return jsonify({"status": "ERROR", "message": "Session is required"}), 400
+            result = live_state.apply_delta(data['s'], data.get('d', 0), data.get('c'), data.get('e', 0),
+                                            data.get('i'), time.time(), data.get('l'))
+            if result is None:
+                return jsonify({"status": "ERROR", "message": "Invalid session"}), 403
+            return jsonify({"status": "OK", "e": result["epoch"]}), 200
 
         @self.app.route('/update_count', methods=['POST'])
         def update_count():
@@ -273,21 +446,91 @@ class FlaskServer:
             if not self._is_valid_client(key, name):
                 return jsonify({"status": "ERROR", "message": "Invalid key or name"}), 403
             client_id = f"{key}_{name}"
-            now = time.time()
-            if client_id in connected_clients:
-                client = connected_clients[client_id]
-                prev = client.get("last_request")
-                client["delay"] = round((now - prev) * 1000, 2) if prev else 0
-                client["last_request"] = now
-                client["people_count"] = people_count
-                if image_base64:
-                    client["image"] = image_base64
-                if client.get("reset_counter", False):
-                    client["reset_counter"] = False  
-                    return jsonify({"status": "OK", "action": "Reset Counter"}), 200
+            result = live_state.record_heartbeat(client_id, people_count, image_base64, time.time(),
+                                                 counters=data.get('counters'))
+            if result is not None:
+                if result["reset_counter"]:
+                    return jsonify({"status": "OK", "action": "Reset Counter", "epoch": result["epoch"]}), 200
                 return jsonify({"status": "OK"}), 200
             return jsonify({"status": "ERROR", "message": "Client not connected"}), 403
 
+        @self.app.route('/update_counts', methods=['POST'])
+        def update_counts():
+            data = request.get_json(silent=True)
+            records = data.get('records') if isinstance(data, dict) else data
+            if not isinstance(records, list) or not records:
+                return jsonify({"status": "ERROR", "message": "A non-empty list of records is required"}), 400
+            if len(records) > self.MAX_BATCH_SIZE:
+                return jsonify({"status": "ERROR", "message": f"At most {self.MAX_BATCH_SIZE} records per request"}), 413
+
+            results = [None] * len(records)
+            heartbeats = []
+            positions = []
+            for i, record in enumerate(records):
+                if not isinstance(record, dict) or 'key' not in record or 'name' not in record or 'people_count' not in record:
+                    results[i] = {"status": "ERROR", "message": "Missing required fields"}
+                    continue
+                key = record['key']
+                name = record['name']
+                if not self._is_valid_client(key, name):
+                    results[i] = {"key": key, "name": name, "status": "ERROR", "message": "Invalid key or name"}
+                    continue
+                if record.get('replay'):
+                    # Samples buffered by a monitor while the controller was
+                    # unreachable only fill the gap in the occupancy history.
+                    ts = record.get('ts')
+                    if not isinstance(ts, (int, float)) or not isinstance(record['people_count'], (int, float)):
+                        results[i] = {"key": key, "name": name, "status": "ERROR", "message": "Replayed records need ts"}
+                        continue
+                    self.history.record(f"monitor:{self.monitor_manager.get_monitor_id(key, name)}",
+                                        record['people_count'], min(ts, time.time()))
+                    results[i] = {"key": key, "name": name, "status": "OK"}
+                    continue
+                heartbeats.append((f"{key}_{name}", record['people_count'], record.get('image'), record.get('ts'),
+                                   record.get('counters')))
+                positions.append(i)
+
+            applied = live_state.record_heartbeats(heartbeats, time.time()) if heartbeats else []
+            for i, result in zip(positions, applied):
+                record = records[i]
+                if result is None:
+                    results[i] = {"key": record['key'], "name": record['name'], "status": "ERROR", "message": "Client not connected"}
+                    continue
+                results[i] = {"key": record['key'], "name": record['name'], "status": "OK"}
+                if result["reset_counter"]:
+                    results[i]["action"] = "Reset Counter"
+                    results[i]["epoch"] = result["epoch"]
+            return jsonify({"status": "OK", "results": results}), 200
+
+        @self.app.route('/thumbnail', methods=['POST'])
+        def upload_thumbnail():
+            # Multipart upload of the raw image file, identified by the channel
+            # session or by key and name.
+            image = request.files.get('image')
+            if image is None:
+                return jsonify({"status": "ERROR", "message": "Image file is required"}), 400
+            data = image.read(self.MAX_THUMBNAIL_SIZE + 1)
+            if len(data) > self.MAX_THUMBNAIL_SIZE:
+                return jsonify({"status": "ERROR", "message": "Thumbnail too large"}), 413
+            if image_content_type(data) == "application/octet-stream":
+                return jsonify({"status": "ERROR", "message": "Unsupported image type"}), 415
+            session = request.form.get('session')
+            if session:
+                image_hash = live_state.put_thumbnail(None, data, session=session)
+                if image_hash is None:
+                    return jsonify({"status": "ERROR", "message": "Invalid session"}), 403
+                return jsonify({"status": "OK", "hash": image_hash}), 200
+            key = request.form.get('key')
+            name = request.form.get('name')
+            if not key or not name:
+                return jsonify({"status": "ERROR", "message": "Session or key and name are required"}), 400
+            if not self._is_valid_client(key, name):
+                return jsonify({"status": "ERROR", "message": "Invalid key or name"}), 403
+            image_hash = live_state.put_thumbnail(f"{key}_{name}", data)
+            if image_hash is None:
+                return jsonify({"status": "ERROR", "message": "Client not connected"}), 403
+            return jsonify({"status": "OK", "hash": image_hash}), 200
+
     def run(self):
         server_settings = self.settings_manager.get_server_settings()
         server_ip = server_settings["ip"]
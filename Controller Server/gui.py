@@ -1,13 +1,13 @@
 from PySide6.QtWidgets import (QMainWindow, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLineEdit, QLabel, QListWidget, QDialog, QCheckBox, QMessageBox, QFileDialog, QListWidgetItem, QComboBox)
 from PySide6.QtCore import Qt, QTimer
-from PySide6.QtGui import QPixmap, QImage
-import base64
-import cv2
-import numpy as np
+from PySide6.QtGui import QPixmap
 import time
+import sqlite3
+from functools import partial
 from settings import RandomGenerator
-from flask_server import connected_clients
+from shared.pixmap_cache import PixmapCache
+from flask_server import live_state, sync_zone_aggregates
 
 class LoginDialog(QDialog):
     def __init__(self, settings_manager):
@@ -209,17 +209,11 @@ class HomePage(QWidget):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             try:
-                import sqlite3
-                conn = sqlite3.connect(self.settings_manager.db_name)
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM accounts WHERE id = ?', (account_id,))
-                if cursor.rowcount == 0:
+                if not self.settings_manager.delete_account(account_id):
                     QMessageBox.warning(self, "Error", "Account does not exist.")
                 else:
-                    conn.commit()
                     QMessageBox.information(self, "Success", "Account has been deleted.")
                     self.refresh_accounts()
-                conn.close()
             except sqlite3.Error as e:
                 QMessageBox.warning(self, "Error", f"Unable to delete account: {str(e)}")
 
@@ -334,17 +328,12 @@ class ZoneManagementTab(QWidget):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             try:
-                import sqlite3
-                conn = sqlite3.connect(self.settings_manager.db_name)
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM zones WHERE id = ?', (zone_id,))
-                if cursor.rowcount == 0:
+                if not self.settings_manager.delete_zone(zone_id):
                     QMessageBox.warning(self, "Error", "Zone does not exist.")
                 else:
-                    conn.commit()
+                    sync_zone_aggregates(self.settings_manager, self.monitor_manager)
                     QMessageBox.information(self, "Success", "Zone has been deleted.")
                     self.refresh_zones()
-                conn.close()
             except sqlite3.Error as e:
                 QMessageBox.warning(self, "Error", f"Unable to delete zone: {str(e)}")
 
@@ -352,6 +341,7 @@ class ZoneManagementTab(QWidget):
         dialog = ZoneDialog(self.monitor_manager, parent=self)
         if dialog.exec() == QDialog.Accepted:
             self.settings_manager.add_zone(dialog.get_zone_data())
+            sync_zone_aggregates(self.settings_manager, self.monitor_manager)
             self.refresh_zones()
 
     def edit_zone(self):
@@ -362,30 +352,18 @@ class ZoneManagementTab(QWidget):
         dialog = ZoneDialog(self.monitor_manager, zone, self)
         if dialog.exec() == QDialog.Accepted:
             self.settings_manager.update_zone(zone["id"], dialog.get_zone_data())
+            sync_zone_aggregates(self.settings_manager, self.monitor_manager)
             self.refresh_zones()
 
     def update_zones_people(self):
-        THRESHOLD = 15.0
-        now = time.time()
-        zones = self.settings_manager.get_all_zones()
-        monitors = self.monitor_manager.get_all_monitors()
-        for zone in zones:
-            counts = []
-            for mname in zone.get("monitors", []):
-                for monitor in monitors:
-                    if monitor["name"] == mname:
-                        client_id = f"{monitor['key']}_{monitor['name']}"
-                        client = connected_clients.get(client_id)
-                        if client and (now - client.get("last_request", 0)) <= THRESHOLD:
-                            counts.append(client.get("people_count", 0))
-                        break
-            zone["people_count"] = (
-                max(counts) if counts and zone.get("mode", "max") == "max" else
-                min(counts) if counts and zone.get("mode") == "min" else
-                int(round(sum(counts) / len(counts))) if counts and zone.get("mode") == "avg" else 
-                sum(counts) if counts and zone.get("mode") == "sum" else 0
-            )
-            self.settings_manager.update_zone(zone["id"], zone)
+        live_counts = {zone["id"]: zone["people_count"] for zone in live_state.zone_snapshot(time.time())}
+        changed = {}
+        for zone in self.settings_manager.get_all_zones():
+            people_count = live_counts.get(zone["id"], 0)
+            if zone.get("people_count") != people_count:
+                changed[zone["id"]] = people_count
+        if changed:
+            self.settings_manager.update_zone_people_counts(changed)
         self.refresh_zones()
 
 class AddMonitorDialog(QDialog):
@@ -474,9 +452,13 @@ class MonitorEditDialog(QDialog):
         self.accept()
 
 class MonitorManagementTab(QWidget):
-    def __init__(self, monitor_manager):
+    def __init__(self, monitor_manager, settings_manager):
         super().__init__()
         self.monitor_manager = monitor_manager
+        self.settings_manager = settings_manager
+        self.pixmap_cache = PixmapCache(parent=self)
+        # hash of the thumbnail shown (or being decoded) in image_label
+        self.shown_hash = None
         self.setup_ui()
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_monitor_data)
@@ -540,17 +522,12 @@ class MonitorManagementTab(QWidget):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             try:
-                import sqlite3
-                conn = sqlite3.connect(self.monitor_manager.db_name)
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM monitors WHERE id = ?', (monitor_id,))
-                if cursor.rowcount == 0:
+                if not self.monitor_manager.delete_monitor(monitor_id):
                     QMessageBox.warning(self, "Error", "Monitor does not exist.")
                 else:
-                    conn.commit()
+                    sync_zone_aggregates(self.settings_manager, self.monitor_manager)
                     QMessageBox.information(self, "Success", "Monitor has been deleted.")
                     self.refresh_monitors()
-                conn.close()
             except sqlite3.Error as e:
                 QMessageBox.warning(self, "Error", f"Unable to delete monitor: {str(e)}")
 
@@ -566,9 +543,7 @@ class MonitorManagementTab(QWidget):
             QMessageBox.warning(self, "Error", "Monitor does not have a key or name.")
             return
         client_id = f"{key}_{name}"
-        if client_id in connected_clients:
-            connected_clients[client_id]["people_count"] = 0
-            connected_clients[client_id]["reset_counter"] = True
+        if live_state.request_reset(client_id):
             QMessageBox.information(self, "Success", "People count has been reset.")
         else:
             QMessageBox.warning(self, "Error", "Monitor is not connected.")
@@ -577,6 +552,7 @@ class MonitorManagementTab(QWidget):
     def add_monitor(self):
         dialog = AddMonitorDialog(self.monitor_manager)
         if dialog.exec() == QDialog.Accepted:
+            sync_zone_aggregates(self.settings_manager, self.monitor_manager)
             self.refresh_monitors()
 
     def show_monitor_detail(self, item):
@@ -593,7 +569,7 @@ class MonitorManagementTab(QWidget):
 
         monitor = monitors[selected]
         client_id = f"{monitor.get('key', '')}_{monitor.get('name', '')}"
-        client = connected_clients.get(client_id)
+        client = live_state.get_client(client_id)
         now = time.time()
         THRESHOLD = 15.0
 
@@ -601,15 +577,15 @@ class MonitorManagementTab(QWidget):
             status = "OK"
             delay = client.get("delay", "-")
             people_count = client.get("people_count", 0)
-            image_b64 = client.get("image")
+            image_hash = client.get("image_hash")
         else:
             status = "ERROR"
             delay = "-"
             people_count = 0
-            image_b64 = None
-            if client:
-                client["image"] = None
-                client["people_count"] = 0
+            image_hash = None
+            # Only written once; every write wakes all /stream subscribers.
+            if client and (client.get("image_hash") or client.get("people_count")):
+                live_state.update_client(client_id, {"image": None, "people_count": 0})
 
         detail = (
             f"Name: {monitor['name']}\n"
@@ -618,32 +594,41 @@ class MonitorManagementTab(QWidget):
             f"Status: {status}\n"
             f"Delay: {delay} ms"
         )
-        if image_b64:
+        if image_hash:
             detail += "\n[Image available]"
         self.detail_label.setText(detail)
 
-        if image_b64:
-            try:
-                image_data = base64.b64decode(image_b64)
-                nparray = np.frombuffer(image_data, np.uint8)
-                frame = cv2.imdecode(nparray, cv2.IMREAD_COLOR)
-                if frame is not None:
-                    frame = cv2.flip(frame, -1)
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    height, width, channel = frame.shape
-                    bytes_per_line = 3 * width
-                    qimg = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
-                    pixmap = QPixmap.fromImage(qimg)
-                    self.image_label.setPixmap(pixmap.scaled(self.image_label.size(), Qt.KeepAspectRatio))
-                else:
+        if not image_hash:
+            self.show_black_image()
+        elif image_hash != self.shown_hash:
+            # The image bytes are only fetched when the cache doesn't have the pixmap.
+            self.shown_hash = image_hash
+            pixmap = self.pixmap_cache.get(image_hash, self.image_label.size())
+            if pixmap is None:
+                thumbnail = live_state.get_thumbnail(client_id)
+                if not thumbnail:
                     self.show_black_image()
-            except Exception as e:
-                print(f"Error decoding image: {e}")
-                self.show_black_image()
-        else:
+                    return
+                self.shown_hash = thumbnail["hash"]
+                pixmap = self.pixmap_cache.request(thumbnail["data"], self.image_label.size(),
+                                                   partial(self.show_thumbnail, thumbnail["hash"]),
+                                                   image_hash=thumbnail["hash"])
+            if pixmap is not None:
+                self.show_thumbnail(self.shown_hash, pixmap)
+
+    def show_thumbnail(self, image_hash, pixmap):
+        # Another monitor or a newer image may have been selected while decoding.
+        if image_hash != self.shown_hash:
+            return
+        if pixmap is None:
             self.show_black_image()
+            # Not retried until the monitor sends a different image.
+            self.shown_hash = image_hash
+        else:
+            self.image_label.setPixmap(pixmap)
 
     def show_black_image(self):
+        self.shown_hash = None
         black = QPixmap(self.image_label.size())
         black.fill(Qt.black)
         self.image_label.setPixmap(black)
@@ -655,6 +640,7 @@ class MonitorManagementTab(QWidget):
         monitor = self.monitor_manager.get_all_monitors()[selected]
         dialog = MonitorEditDialog(self.monitor_manager, monitor)
         if dialog.exec() == QDialog.Accepted:
+            sync_zone_aggregates(self.settings_manager, self.monitor_manager)
             self.refresh_monitors()
 
 class MainWindow(QMainWindow):
@@ -669,7 +655,7 @@ class MainWindow(QMainWindow):
         self.tab_widget = QTabWidget()
         self.home_page = HomePage(self.settings_manager)
         self.zone_tab = ZoneManagementTab(self.settings_manager, self.monitor_manager)
-        self.monitor_tab = MonitorManagementTab(self.monitor_manager)
+        self.monitor_tab = MonitorManagementTab(self.monitor_manager, self.settings_manager)
         self.tab_widget.addTab(self.home_page, "Home")
         self.tab_widget.addTab(self.zone_tab, "Zone Management")
         self.tab_widget.addTab(self.monitor_tab, "Monitor Management")
@@ -0,0 +1,227 @@
+import os
+import threading
+import time
+from database import Database
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, where the controller runs as a single process anyway.
+    fcntl = None
+
+class OccupancyHistory:
+    # resolution -> (table, bucket size in seconds)
+    RESOLUTIONS = {
+        "raw": ("occupancy_samples", 1),
+        "1m": ("occupancy_1m", 60),
+        "1h": ("occupancy_1h", 3600),
+    }
+    DEFAULT_RETENTION = {
+        "raw": 2 * 86400,
+        "1m": 30 * 86400,
+        "1h": 400 * 86400,
+    }
+
+    def __init__(self, db_name="app_database.db", flush_interval=1.0, rollup_interval=60.0, retention=None):
+        self.db = Database.get(db_name)
+        # Every worker process flushes what it records, but only the one
+        # holding this lock samples the live state and rolls up, so samples
+        # aren't written once per worker. The others retry it every
+        # rollup_interval and take over when the sampling worker exits.
+        self.lock_path = os.path.abspath(db_name) + ".history.lock"
+        self._lock_file = None
+        self.flush_interval = flush_interval
+        self.rollup_interval = rollup_interval
+        self.retention = dict(self.DEFAULT_RETENTION, **(retention or {}))
+        # (series, second) -> value; the latest value within a second wins.
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        # Oldest second recorded outside the regular rollup window, e.g. by a
+        # monitor replaying counts buffered during an outage. flush() moves it
+        # to occupancy_meta, where the sampling worker's rollup picks it up.
+        self._late_since = None
+        self._sampler = None
+        self._thread = None
+        self._pid = None
+        self._stopped = threading.Event()
+        self._init_db()
+
+    def _init_db(self):
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS occupancy_samples (
+                    series TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (series, ts)
+                ) WITHOUT ROWID
+            ''')
+            for table in ("occupancy_1m", "occupancy_1h"):
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        series TEXT NOT NULL,
+                        ts INTEGER NOT NULL,
+                        min REAL NOT NULL,
+                        max REAL NOT NULL,
+                        avg REAL NOT NULL,
+                        samples INTEGER NOT NULL,
+                        PRIMARY KEY (series, ts)
+                    ) WITHOUT ROWID
+                ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS occupancy_meta (
+                    name TEXT PRIMARY KEY,
+                    value REAL NOT NULL
+                )
+            ''')
+
+    def record(self, series, value, ts=None):
+        second = int(ts if ts is not None else time.time())
+        with self._pending_lock:
+            self._pending[(series, second)] = value
+            if ts is not None and second < time.time() - 60:
+                self._late_since = second if self._late_since is None else min(self._late_since, second)
+
+    def start(self, sampler=None):
+        # sampler() -> [(series, value), ...] is polled once per flush_interval
+        # by the sampling worker. Threads don't survive a fork, so each worker
+        # process starts its own to flush what it records.
+        self._sampler = sampler
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            self._stopped.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def is_sampling(self):
+        return self._lock_file is not None
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        self._release_sampling()
+
+    def _acquire_sampling(self):
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            self._lock_file = True
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _release_sampling(self):
+        if self._lock_file is not None and self._lock_file is not True:
+            self._lock_file.close()
+        self._lock_file = None
+
+    def _run(self):
+        next_rollup = time.time()
+        while True:
+            try:
+                if time.time() >= next_rollup:
+                    if not self.is_sampling() and self._acquire_sampling():
+                        # Catch up on whatever wasn't rolled up while no worker was sampling.
+                        self.rollup(backfill=True)
+                    elif self.is_sampling():
+                        self.rollup()
+                        self.prune()
+                    next_rollup = time.time() + self.rollup_interval
+                if self._sampler is not None and self.is_sampling():
+                    now = time.time()
+                    for series, value in self._sampler():
+                        self.record(series, value, now)
+                self.flush()
+            except Exception as e:
+                print(f"Error writing occupancy history: {e}")
+            if self._stopped.wait(self.flush_interval):
+                return
+
+    def flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            late_since, self._late_since = self._late_since, None
+        if not pending:
+            return
+        with self.db.transaction() as cursor:
+            cursor.executemany('INSERT OR REPLACE INTO occupancy_samples (series, ts, value) VALUES (?, ?, ?)',
+                               [(series, ts, value) for (series, ts), value in pending.items()])
+            if late_since is not None:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO occupancy_meta (name, value)
+                    VALUES ('late_since', MIN(?, COALESCE((SELECT value FROM occupancy_meta WHERE name = 'late_since'), ?)))
+                ''', (late_since, late_since))
+
+    def rollup(self, now=None, backfill=False):
+        now = int(now if now is not None else time.time())
+        # Recomputing the last two complete buckets keeps the rollup idempotent
+        # and picks up samples that were flushed late. A backfill covers the
+        # time since the last recorded rollup, or everything still retained.
+        minute_end = now - now % 60
+        hour_end = now - now % 3600
+        minute_start = minute_end - 2 * 60
+        hour_start = hour_end - 2 * 3600
+        if backfill:
+            rows = self.db.fetchall("SELECT value FROM occupancy_meta WHERE name = 'rolled_up_until'")
+            since = int(rows[0][0]) if rows else 0
+            minute_start = min(minute_start, max(minute_end - self.retention["raw"], since - since % 60 - 2 * 60))
+            hour_start = min(hour_start, max(hour_end - self.retention["1m"], since - since % 3600 - 2 * 3600))
+        row = self.db.fetchone("SELECT value FROM occupancy_meta WHERE name = 'late_since'")
+        late_since = int(row[0]) if row else None
+        if late_since is not None:
+            minute_start = min(minute_start, late_since - late_since % 60)
+            hour_start = min(hour_start, late_since - late_since % 3600)
+        with self.db.transaction() as cursor:
+            # Left in place if another worker recorded something older meanwhile.
+            cursor.execute("DELETE FROM occupancy_meta WHERE name = 'late_since' AND value = ?", (late_since,))
+            cursor.execute('''
+                INSERT OR REPLACE INTO occupancy_1m (series, ts, min, max, avg, samples)
+                SELECT series, ts - ts % 60, MIN(value), MAX(value), AVG(value), COUNT(*)
+                FROM occupancy_samples WHERE ts >= ? AND ts < ?
+                GROUP BY series, ts - ts % 60
+            ''', (minute_start, minute_end))
+            cursor.execute('''
+                INSERT OR REPLACE INTO occupancy_1h (series, ts, min, max, avg, samples)
+                SELECT series, ts - ts % 3600, MIN(min), MAX(max), SUM(avg * samples) / SUM(samples), SUM(samples)
+                FROM occupancy_1m WHERE ts >= ? AND ts < ?
+                GROUP BY series, ts - ts % 3600
+            ''', (hour_start, hour_end))
+            cursor.execute("INSERT OR REPLACE INTO occupancy_meta (name, value) VALUES ('rolled_up_until', ?)", (now,))
+
+    def prune(self, now=None):
+        now = int(now if now is not None else time.time())
+        with self.db.transaction() as cursor:
+            for resolution, (table, _) in self.RESOLUTIONS.items():
+                cursor.execute(f'DELETE FROM {table} WHERE ts < ?', (now - self.retention[resolution],))
+
+    def pick_resolution(self, start, end):
+        span = end - start
+        if span <= 3600:
+            return "raw"
+        if span <= 3 * 86400:
+            return "1m"
+        return "1h"
+
+    def query(self, series, start, end, resolution="auto"):
+        if resolution == "auto":
+            resolution = self.pick_resolution(start, end)
+        table, _ = self.RESOLUTIONS[resolution]
+        if resolution == "raw":
+            rows = self.db.fetchall(f'SELECT ts, value, value, value, 1 FROM {table} '
+                                    'WHERE series = ? AND ts >= ? AND ts <= ? ORDER BY ts', (series, int(start), int(end)))
+        else:
+            rows = self.db.fetchall(f'SELECT ts, min, max, avg, samples FROM {table} '
+                                    'WHERE series = ? AND ts >= ? AND ts <= ? ORDER BY ts', (series, int(start), int(end)))
+        return resolution, [{'ts': row[0], 'min': row[1], 'max': row[2], 'avg': row[3], 'samples': row[4]}
+                            for row in rows]
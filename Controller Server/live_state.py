@@ -0,0 +1,366 @@
+import os
+import copy
+import time
+import secrets
+import threading
+from multiprocessing.managers import BaseManager
+from aggregation import ZoneAggregator
+from thumbnails import ThumbnailStore
+
+# The proxy protocol is pickle, so anyone holding the key can run code in
+# the controller. There's no default; set it per deployment.
+AUTHKEY_ENV = "SMARTFLOW_LIVE_STATE_KEY"
+
+def _authkey(authkey):
+    authkey = authkey if authkey is not None else os.getenv(AUTHKEY_ENV, "")
+    if not authkey:
+        raise RuntimeError(f"{AUTHKEY_ENV} must be set to a secret key to share the live state")
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+class LiveStateStore:
+    # Commands waiting for a channel that is briefly re-opening; older ones
+    # are dropped beyond this.
+    MAX_QUEUED_COMMANDS = 32
+
+    def __init__(self, threshold=15.0):
+        self._lock = threading.RLock()
+        self._commands_changed = threading.Condition(self._lock)
+        self._state_changed = threading.Condition(self._lock)
+        self._version = 0
+        self._clients = {}
+        self._tokens = {}
+        self._sessions = {}
+        self._commands = {}
+        # client_id -> number of open /channel streams
+        self._channels = {}
+        self._zones = ZoneAggregator(threshold)
+        self._thumbnails = ThumbnailStore()
+
+    def _touch(self):
+        self._version += 1
+        self._state_changed.notify_all()
+
+    def _set_image(self, client_id, client, image):
+        # Thumbnails live in the blob store, clients only carry the content hash.
+        client["image_hash"] = self._thumbnails.put(client_id, image)
+
+    def _sync_zones(self, client_id):
+        client = self._clients.get(client_id)
+        if client is None or not client.get("last_request"):
+            self._zones.remove(client_id)
+        else:
+            self._zones.update(client_id, client.get("people_count", 0), client["last_request"], time.time())
+
+    def configure_zones(self, zones, monitors):
+        with self._lock:
+            self._zones.configure(zones, monitors)
+            self._touch()
+
+    def zones_configured(self):
+        with self._lock:
+            return self._zones.configured
+
+    def zone_snapshot(self, now):
+        with self._lock:
+            return self._zones.snapshot(now)
+
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def wait_for_change(self, version, timeout):
+        with self._lock:
+            if self._version == version:
+                self._state_changed.wait(timeout)
+            return self._version
+
+    def get_client(self, client_id):
+        with self._lock:
+            client = self._clients.get(client_id)
+            return copy.copy(client) if client is not None else None
+
+    def set_client(self, client_id, data):
+        with self._lock:
+            client = dict(data)
+            self._set_image(client_id, client, client.pop("image", None))
+            self._clients[client_id] = client
+            self._sync_zones(client_id)
+            self._touch()
+
+    def update_client(self, client_id, fields):
+        with self._lock:
+            client = self._clients.get(client_id)
+            if client is None:
+                return None
+            fields = dict(fields)
+            if "image" in fields:
+                self._set_image(client_id, client, fields.pop("image"))
+            client.update(fields)
+            self._sync_zones(client_id)
+            self._touch()
+            return copy.copy(client)
+
+    def remove_client(self, client_id):
+        with self._lock:
+            client = self._clients.pop(client_id, None)
+            if client is None:
+                return False
+            self._sessions.pop(client.get("session"), None)
+            self._commands.pop(client_id, None)
+            self._commands_changed.notify_all()
+            self._zones.remove(client_id)
+            self._thumbnails.remove(client_id)
+            self._touch()
+            return True
+
+    def connect_client(self, client_id, data):
+        with self._lock:
+            previous = self._clients.get(client_id)
+            if previous is not None:
+                self._sessions.pop(previous.get("session"), None)
+            client = dict(data)
+            self._set_image(client_id, client, client.pop("image", None))
+            client["session"] = secrets.token_hex(8)
+            client["epoch"] = previous.get("epoch", 0) if previous else 0
+            self._clients[client_id] = client
+            self._sessions[client["session"]] = client_id
+            self._commands[client_id] = []
+            self._commands_changed.notify_all()
+            self._sync_zones(client_id)
+            self._touch()
+            return {"session": client["session"], "epoch": client["epoch"]}
+
+    def get_session_client(self, session):
+        with self._lock:
+            return self._sessions.get(session)
+
+    def all_clients(self):
+        with self._lock:
+            return {client_id: copy.copy(client) for client_id, client in self._clients.items()}
+
+    def _set_counters(self, client, counters):
+        # Per-line and per-zone counts from the monitor's counting engine.
+        if isinstance(counters, dict):
+            client["counters"] = counters
+
+    def record_heartbeat(self, client_id, people_count, image, now, ts=None, counters=None):
+        with self._lock:
+            return self._apply_heartbeat(client_id, people_count, image, now, ts, counters)
+
+    def record_heartbeats(self, heartbeats, now):
+        # heartbeats: [(client_id, people_count, image, ts, counters), ...], applied under one lock
+        with self._lock:
+            return [self._apply_heartbeat(client_id, people_count, image, now, ts, counters)
+                    for client_id, people_count, image, ts, counters in heartbeats]
+
+    def _apply_heartbeat(self, client_id, people_count, image, now, ts, counters=None):
+        client = self._clients.get(client_id)
+        if client is None:
+            return None
+        reset = client.get("reset_counter", False)
+        client["reset_counter"] = False
+        last_ts = client.get("last_sample_ts")
+        if ts is not None and last_ts is not None and ts < last_ts:
+            # Out of order sample from a gateway, keep the newer value.
+            return {"reset_counter": reset, "epoch": client.get("epoch", 0), "stale": True}
+        prev = client.get("last_request")
+        client["delay"] = round((now - prev) * 1000, 2) if prev else 0
+        client["last_request"] = now
+        client["last_sample_ts"] = ts if ts is not None else now
+        client["people_count"] = people_count
+        self._set_counters(client, counters)
+        if image:
+            self._set_image(client_id, client, image)
+        self._sync_zones(client_id)
+        self._touch()
+        return {"reset_counter": reset, "epoch": client.get("epoch", 0), "stale": False}
+
+    def request_reset(self, client_id):
+        with self._lock:
+            client = self._clients.get(client_id)
+            if client is None:
+                return False
+            client["people_count"] = 0
+            client["reset_counter"] = True
+            client["epoch"] = client.get("epoch", 0) + 1
+            self._sync_zones(client_id)
+            self._touch()
+            # Without a channel the reset goes out with the next /update_count reply.
+            if self._channels.get(client_id):
+                self._queue_command(client_id, {"action": "Reset Counter", "epoch": client["epoch"]})
+            return True
+
+    def push_command(self, client_id, command):
+        # Commands only reach monitors over /channel, so without one open
+        # they can't be delivered.
+        with self._lock:
+            if client_id not in self._clients or not self._channels.get(client_id):
+                return False
+            self._queue_command(client_id, dict(command))
+            return True
+
+    def _queue_command(self, client_id, command):
+        commands = self._commands.setdefault(client_id, [])
+        commands.append(command)
+        del commands[:-self.MAX_QUEUED_COMMANDS]
+        self._commands_changed.notify_all()
+
+    def attach_channel(self, client_id):
+        with self._lock:
+            self._channels[client_id] = self._channels.get(client_id, 0) + 1
+
+    def detach_channel(self, client_id):
+        with self._lock:
+            remaining = self._channels.get(client_id, 0) - 1
+            if remaining > 0:
+                self._channels[client_id] = remaining
+            else:
+                self._channels.pop(client_id, None)
+
+    def wait_commands(self, client_id, session, timeout):
+        # Blocks until commands are queued for the client, returns None once
+        # the session has been replaced or the client removed.
+        deadline = time.time() + timeout
+        with self._lock:
+            while True:
+                client = self._clients.get(client_id)
+                if client is None or client.get("session") != session:
+                    return None
+                commands = self._commands.get(client_id)
+                if commands:
+                    self._commands[client_id] = []
+                    if any(command.get("action") == "Reset Counter" for command in commands):
+                        client["reset_counter"] = False
+                    return commands
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return []
+                self._commands_changed.wait(remaining)
+
+    def apply_delta(self, session, delta, count, epoch, image, now, counters=None):
+        with self._lock:
+            client_id = self._sessions.get(session)
+            client = self._clients.get(client_id) if client_id else None
+            if client is None:
+                return None
+            prev = client.get("last_request")
+            client["delay"] = round((now - prev) * 1000, 2) if prev else 0
+            client["last_request"] = now
+            client["last_sample_ts"] = now
+            current_epoch = client.get("epoch", 0)
+            # Updates counted before a reset are dropped, the monitor catches up
+            # once it has applied the reset command.
+            if epoch == current_epoch:
+                if count is not None:
+                    client["people_count"] = count
+                elif delta:
+                    client["people_count"] = max(0, client.get("people_count", 0) + delta)
+                self._set_counters(client, counters)
+            if image:
+                self._set_image(client_id, client, image)
+            self._sync_zones(client_id)
+            self._touch()
+            return {"epoch": current_epoch}
+
+    def put_thumbnail(self, client_id, image, session=None):
+        with self._lock:
+            if session is not None:
+                client_id = self._sessions.get(session)
+            client = self._clients.get(client_id) if client_id else None
+            if client is None:
+                return None
+            self._set_image(client_id, client, image)
+            self._touch()
+            return client["image_hash"]
+
+    def get_thumbnail(self, client_id):
+        with self._lock:
+            blob = self._thumbnails.get(client_id)
+            return dict(blob) if blob is not None else None
+
+    def set_token(self, token, info):
+        with self._lock:
+            self._tokens[token] = dict(info)
+
+    def get_token(self, token):
+        with self._lock:
+            info = self._tokens.get(token)
+            return copy.copy(info) if info is not None else None
+
+    def remove_token(self, token):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+class LiveStateManager(BaseManager):
+    pass
+
+_shared_store = None
+
+def _get_shared_store():
+    global _shared_store
+    if _shared_store is None:
+        _shared_store = LiveStateStore()
+    return _shared_store
+
+LiveStateManager.register("get_store", callable=_get_shared_store)
+
+def _parse_address(address):
+    if ":" in address and not address.startswith("/"):
+        host, port = address.rsplit(":", 1)
+        return (host, int(port))
+    return address
+
+# Proxy to a LiveStateStore hosted by `python live_state.py <address>`, so
+# every uWSGI worker sees the same clients and tokens. The address is either
+# host:port or a unix socket path.
+class SharedLiveState:
+    def __init__(self, address, authkey=None, connect_timeout=10.0):
+        self.address = _parse_address(address)
+        self.authkey = _authkey(authkey)
+        self.connect_timeout = connect_timeout
+        self._store = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_store(self):
+        # Proxies must not be shared across a fork, reconnect in each worker.
+        if self._store is None or self._pid != os.getpid():
+            with self._lock:
+                if self._store is None or self._pid != os.getpid():
+                    self._store = self._connect()
+                    self._pid = os.getpid()
+        return self._store
+
+    def _connect(self):
+        # The server may be started alongside the workers, give it a moment.
+        deadline = time.time() + self.connect_timeout
+        while True:
+            manager = LiveStateManager(address=self.address, authkey=self.authkey)
+            try:
+                manager.connect()
+                return manager.get_store()
+            except (ConnectionRefusedError, FileNotFoundError):
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.2)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._get_store(), name)
+
+def create_live_state(address=None, authkey=None):
+    address = address if address is not None else os.getenv("SMARTFLOW_LIVE_STATE", "")
+    if not address or address == "memory":
+        return LiveStateStore()
+    return SharedLiveState(address, authkey)
+
+def serve(address, authkey=None):
+    manager = LiveStateManager(address=_parse_address(address), authkey=_authkey(authkey))
+    server = manager.get_server()
+    print(f"Live state server listening on {address}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    import sys
+    serve(sys.argv[1] if len(sys.argv) > 1 else os.getenv("SMARTFLOW_LIVE_STATE", "127.0.0.1:8765"))
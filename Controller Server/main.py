@@ -1,6 +1,8 @@
 import sys
 import threading
 import os
+# shared/ at the repository root holds the modules the apps have in common.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 from settings import SettingsManager
 from monitor import MonitorManager
 from flask_server import FlaskServer
@@ -1,15 +1,21 @@
-import sqlite3
-import os
+import threading
+import time
+from database import Database
 
 class MonitorManager:
-    def __init__(self, db_name="app_database.db"):
+    def __init__(self, db_name="app_database.db", credentials_ttl=30.0):
         self.db_name = db_name
+        self.db = Database.get(db_name)
+        # (key, name) -> monitor id, loaded lazily and dropped on every write.
+        # The TTL only matters when several processes share the database.
+        self.credentials_ttl = credentials_ttl
+        self._credentials = None
+        self._credentials_loaded_at = 0
+        self._credentials_lock = threading.Lock()
         self._init_db()
 
     def _init_db(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('''
+        self.db.execute('''
             CREATE TABLE IF NOT EXISTS monitors (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
@@ -22,64 +28,81 @@ class MonitorManager:
                 delay REAL DEFAULT 0
             )
         ''')
-        conn.commit()
-        conn.close()
 
-    def add_monitor(self, monitor):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('''
+    INSERT_MONITOR = '''
             INSERT INTO monitors (name, key, url, status, zone_id, people_count, image, delay) 
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (monitor.get('name', ''), 
-              monitor.get('key', ''), 
-              monitor.get('url', ''), 
-              monitor.get('status', 'active'),
-              monitor.get('zone_id', None),
-              monitor.get('people_count', 0),
-              monitor.get('image', ''),
-              monitor.get('delay', 0)))
-        conn.commit()
+        '''
+
+    def _monitor_params(self, monitor):
+        return (monitor.get('name', ''), 
+                monitor.get('key', ''), 
+                monitor.get('url', ''), 
+                monitor.get('status', 'active'),
+                monitor.get('zone_id', None),
+                monitor.get('people_count', 0),
+                monitor.get('image', ''),
+                monitor.get('delay', 0))
+
+    def add_monitor(self, monitor):
+        cursor = self.db.execute(self.INSERT_MONITOR, self._monitor_params(monitor))
         new_id = cursor.lastrowid
-        conn.close()
+        self.invalidate_credentials()
         return new_id
 
+    def add_monitors(self, monitors):
+        self.db.executemany(self.INSERT_MONITOR, [self._monitor_params(monitor) for monitor in monitors])
+        self.invalidate_credentials()
+
     def update_monitor(self, monitor_id, monitor):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('''
+        self.db.execute('''
             UPDATE monitors 
             SET name = ?, key = ?, url = ?, status = ?, zone_id = ?, people_count = ?, image = ?, delay = ?
             WHERE id = ?
-        ''', (monitor.get('name', ''),
-              monitor.get('key', ''),  
-              monitor.get('url', ''),
-              monitor.get('status', 'active'),
-              monitor.get('zone_id', None),
-              monitor.get('people_count', 0),
-              monitor.get('image', ''),
-              monitor.get('delay', 0),
-              monitor_id))
-        conn.commit()
-        conn.close()
+        ''', self._monitor_params(monitor) + (monitor_id,))
+        self.invalidate_credentials()
+
+    def delete_monitor(self, monitor_id):
+        cursor = self.db.execute('DELETE FROM monitors WHERE id = ?', (monitor_id,))
+        deleted = cursor.rowcount > 0
+        if deleted:
+            self.invalidate_credentials()
+        return deleted
+
+    def invalidate_credentials(self):
+        with self._credentials_lock:
+            self._credentials = None
+
+    def _get_credentials(self):
+        credentials = self._credentials
+        if credentials is not None and time.time() - self._credentials_loaded_at <= self.credentials_ttl:
+            return credentials
+        with self._credentials_lock:
+            if self._credentials is None or time.time() - self._credentials_loaded_at > self.credentials_ttl:
+                rows = self.db.fetchall('SELECT id, key, name FROM monitors')
+                self._credentials = {(row[1], row[2]): row[0] for row in rows}
+                self._credentials_loaded_at = time.time()
+            return self._credentials
+
+    def get_monitor_credentials(self):
+        return [{'id': monitor_id, 'key': key, 'name': name}
+                for (key, name), monitor_id in sorted(self._get_credentials().items(), key=lambda item: item[1])]
+
+    def is_valid_credential(self, key, name):
+        return (key, name) in self._get_credentials()
+
+    def get_monitor_id(self, key, name):
+        return self._get_credentials().get((key, name))
 
     def get_all_monitors(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM monitors')
         monitors = [{'id': row[0], 'name': row[1], 'key': row[2], 'url': row[3], 
                     'status': row[4], 'zone_id': row[5], 'people_count': row[6], 
                     'image': row[7], 'delay': row[8]} 
-                   for row in cursor.fetchall()]
-        conn.close()
+                   for row in self.db.fetchall('SELECT * FROM monitors')]
         return monitors
 
     def get_monitor_by_id(self, monitor_id):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM monitors WHERE id = ?', (monitor_id,))
-        row = cursor.fetchone()
-        conn.close()
+        row = self.db.fetchone('SELECT * FROM monitors WHERE id = ?', (monitor_id,))
         if row:
             return {'id': row[0], 'name': row[1], 'key': row[2], 'url': row[3], 
                    'status': row[4], 'zone_id': row[5], 'people_count': row[6], 
@@ -0,0 +1,45 @@
+import base64
+import binascii
+import hashlib
+
+def image_content_type(data):
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    return "application/octet-stream"
+
+class ThumbnailStore:
+    def __init__(self):
+        # client_id -> {"hash", "data", "content_type"}; only the latest image
+        # of each monitor is kept.
+        self.blobs = {}
+
+    def put(self, client_id, image):
+        # image is raw bytes or the base64 string monitors send inside JSON.
+        if not image:
+            self.remove(client_id)
+            return None
+        if isinstance(image, str):
+            try:
+                image = base64.b64decode(image, validate=True)
+            except (binascii.Error, ValueError):
+                return self.get_hash(client_id)
+        digest = hashlib.blake2b(image, digest_size=12).hexdigest()
+        current = self.blobs.get(client_id)
+        if current is None or current["hash"] != digest:
+            self.blobs[client_id] = {"hash": digest, "data": bytes(image),
+                                     "content_type": image_content_type(image)}
+        return digest
+
+    def get(self, client_id):
+        return self.blobs.get(client_id)
+
+    def get_hash(self, client_id):
+        blob = self.blobs.get(client_id)
+        return blob["hash"] if blob is not None else None
+
+    def remove(self, client_id):
+        self.blobs.pop(client_id, None)
@@ -0,0 +1,159 @@
+import numpy as np
+from track_state import TrackTable
+
+def line_side(line, point):
+    # Sign of the cross product AB x AP: 1 / -1 for either side of the line, 0 on it.
+    (ax, ay), (bx, by) = line
+    cross = (bx - ax) * (point[1] - ay) - (by - ay) * (point[0] - ax)
+    return 1 if cross > 0 else -1 if cross < 0 else 0
+
+def crossing_delta(prev_side, side, left_to_right=True):
+    # +1 for a crossing in the entry direction, -1 for the opposite one.
+    if not prev_side or not side or prev_side == side:
+        return 0
+    moved_left_to_right = prev_side == -1 and side == 1
+    return 1 if moved_left_to_right == left_to_right else -1
+
+def line_sides(lines, points):
+    # lines: (L, 2, 2), points: (N, 2) -> (N, L) int8 matrix of line_side values.
+    a = lines[:, 0]
+    ab = lines[:, 1] - a
+    cross = ab[:, 0] * (points[:, None, 1] - a[:, 1]) - ab[:, 1] * (points[:, None, 0] - a[:, 0])
+    return np.sign(cross).astype(np.int8)
+
+def points_in_polygon(polygon, points):
+    # Even-odd ray casting of (N, 2) points against one (V, 2) polygon.
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(straddles & (x < x_cross), axis=1) % 2 == 1
+
+class CountingEngine:
+    # Counts line crossings and polygon entries for all tracks of a frame at
+    # once. Lines are two points with an entry direction, zones are polygons.
+    # A track's last non-zero side per line and inside/outside state per zone
+    # are kept in a bounded TrackTable until it hasn't been seen for `ttl` frames.
+    def __init__(self, ttl=90, capacity=128):
+        self.frame = 0
+        self.line_names = []
+        self.line_points = np.empty((0, 2, 2), dtype=np.float32)
+        self.line_entry = np.empty(0, dtype=np.int8)
+        self.zone_names = []
+        self.zone_polygons = []
+        self.tracks = TrackTable(capacity, ttl)
+        self.line_counts = {}
+        self.zone_counts = {}
+
+    def set_line(self, name, points, left_to_right=True):
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)[:2]
+        if len(points) != 2:
+            self.remove_line(name)
+            return
+        entry = 1 if left_to_right else -1
+        if name in self.line_names:
+            i = self.line_names.index(name)
+            if np.array_equal(self.line_points[i], points) and self.line_entry[i] == entry:
+                return
+            self.line_points[i] = points
+            self.line_entry[i] = entry
+            self.tracks.reset_line(i)
+        else:
+            self.line_names.append(name)
+            self.line_points = np.concatenate([self.line_points, points[None]])
+            self.line_entry = np.append(self.line_entry, np.int8(entry))
+            self.tracks.add_line()
+        self.line_counts.setdefault(name, {"in": 0, "out": 0})
+
+    def remove_line(self, name):
+        if name not in self.line_names:
+            return
+        i = self.line_names.index(name)
+        del self.line_names[i]
+        self.line_points = np.delete(self.line_points, i, axis=0)
+        self.line_entry = np.delete(self.line_entry, i)
+        self.tracks.remove_line(i)
+
+    def set_zone(self, name, polygon):
+        polygon = np.asarray(polygon, dtype=np.float32).reshape(-1, 2)
+        if name in self.zone_names:
+            self.zone_polygons[self.zone_names.index(name)] = polygon
+        else:
+            self.zone_names.append(name)
+            self.zone_polygons.append(polygon)
+            self.tracks.add_zone()
+        self.zone_counts.setdefault(name, {"in": 0, "out": 0, "occupancy": 0})
+
+    def reset_counts(self):
+        for counts in self.line_counts.values():
+            counts.update({"in": 0, "out": 0})
+        for counts in self.zone_counts.values():
+            counts.update({"in": 0, "out": 0})
+
+    def clear(self):
+        self.tracks.clear()
+
+    def update(self, track_ids, centroids):
+        # Returns {line name: net crossings} for this frame (entries - exits).
+        self.frame += 1
+        track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        points = np.asarray(centroids, dtype=np.float32).reshape(-1, 2)
+        deltas = dict.fromkeys(self.line_names, 0)
+        if len(track_ids):
+            slots = self.tracks.lookup(track_ids.tolist(), self.frame)
+            if self.line_names:
+                self._update_lines(slots, points, deltas)
+            if self.zone_names:
+                self._update_zones(slots, points)
+        else:
+            for counts in self.zone_counts.values():
+                counts["occupancy"] = 0
+        self.tracks.evict(self.frame)
+        return deltas
+
+    def _update_lines(self, slots, points, deltas):
+        sides = line_sides(self.line_points, points)
+        previous = self.tracks.sides[slots]
+        crossed = (previous != 0) & (sides != 0) & (previous != sides)
+        # A crossing from -1 to 1 is left to right; entries match line_entry.
+        direction = np.where(crossed, np.where(sides == self.line_entry, 1, -1), 0)
+        # Points exactly on a line keep their last side, so passing through it
+        # still counts as a crossing.
+        self.tracks.sides[slots] = np.where(sides != 0, sides, previous)
+        ins = np.count_nonzero(direction == 1, axis=0)
+        outs = np.count_nonzero(direction == -1, axis=0)
+        for i, name in enumerate(self.line_names):
+            if ins[i] or outs[i]:
+                self.line_counts[name]["in"] += int(ins[i])
+                self.line_counts[name]["out"] += int(outs[i])
+                deltas[name] = int(ins[i]) - int(outs[i])
+
+    def _update_zones(self, slots, points):
+        inside = np.stack([points_in_polygon(polygon, points) for polygon in self.zone_polygons], axis=1)
+        # Tracks that appear inside a zone were not seen entering it.
+        previous = np.where(self.tracks.placed[slots, None], self.tracks.inside[slots], inside)
+        entered = np.count_nonzero(inside & ~previous, axis=0)
+        left = np.count_nonzero(~inside & previous, axis=0)
+        self.tracks.inside[slots] = inside
+        self.tracks.placed[slots] = True
+        occupancy = np.count_nonzero(inside, axis=0)
+        for i, name in enumerate(self.zone_names):
+            counts = self.zone_counts[name]
+            counts["in"] += int(entered[i])
+            counts["out"] += int(left[i])
+            counts["occupancy"] = int(occupancy[i])
+
+    def counters(self):
+        # Flat {name: counts} for lines and zones, as reported to the controller.
+        counters = {name: dict(self.line_counts[name]) for name in self.line_names}
+        counters.update((name, dict(counts)) for name, counts in self.zone_counts.items())
+        return counters
+
+    def snapshot(self):
+        return {
+            "lines": {name: dict(counts) for name, counts in self.line_counts.items() if name in self.line_names},
+            "zones": {name: dict(counts) for name, counts in self.zone_counts.items()},
+            "tracks": len(self.tracks),
+        }
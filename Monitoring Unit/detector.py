@@ -0,0 +1,57 @@
+import os
+import shutil
+import hashlib
+
+BACKENDS = ("torch", "onnx", "openvino")
+DEFAULT_CACHE_DIR = "exported_models"
+
+def _file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def export_path(model_name, backend, cache_dir=DEFAULT_CACHE_DIR, imgsz=640, batch=1):
+    # The cache key covers the weights and the export settings, so replacing
+    # model.pt or changing imgsz/batch triggers a fresh export. Batched
+    # exports take any batch size up to `batch`.
+    stem = os.path.splitext(os.path.basename(model_name))[0]
+    digest = _file_digest(model_name) if os.path.isfile(model_name) else "remote"
+    key = f"{stem}-{digest}-{imgsz}-" + (f"b{batch}" if batch == 1 else f"dyn{batch}")
+    if backend == "onnx":
+        return os.path.join(cache_dir, f"{key}.onnx")
+    return os.path.join(cache_dir, f"{key}_openvino_model")
+
+def export_model(model_name, backend, cache_dir=DEFAULT_CACHE_DIR, imgsz=640, batch=1):
+    from ultralytics import YOLO
+    model = None
+    if not os.path.isfile(model_name):
+        # Let ultralytics download the weights first, the cache key hashes the file.
+        model = YOLO(model_name)
+        model_name = str(model.ckpt_path or model_name)
+    target = export_path(model_name, backend, cache_dir, imgsz, batch)
+    if os.path.exists(target):
+        return target
+    os.makedirs(cache_dir, exist_ok=True)
+    print(f"Exporting {model_name} to {backend}, this only happens once...")
+    # multi_stream can hand over partial batches, which a fixed-batch engine rejects.
+    exported = (model or YOLO(model_name)).export(format=backend, imgsz=imgsz, batch=batch, dynamic=batch > 1,
+                                                  verbose=False)
+    # Move into place last so an interrupted export is never picked up.
+    shutil.move(str(exported), target)
+    return target
+
+def load_detector(model_name="model.pt", backend="torch", cache_dir=DEFAULT_CACHE_DIR, imgsz=640,
+                  batch=1, device=None):
+    # Returns an ultralytics YOLO model; exported backends keep the same
+    # predict/track API, so person filtering and ByteTrack work unchanged.
+    from ultralytics import YOLO
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    if backend == "torch":
+        if device is None:
+            import torch
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        return YOLO(model_name, verbose=False).to(device)
+    return YOLO(export_model(model_name, backend, cache_dir, imgsz, batch), task="detect", verbose=False)
@@ -0,0 +1,37 @@
+import threading
+import numpy as np
+
+class FrameExchange:
+    # Double-buffered hand-off of the newest frame from a producer thread to
+    # a consumer such as the UI. Both buffers are allocated once per frame
+    # shape; the producer copies into the back buffer outside the lock and
+    # only the swap is locked. The consumer reads the front buffer under the
+    # lock, and only when the version moved past the one it last saw.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buffers = None
+        self.front = 0
+        self.version = 0
+
+    def write(self, frame):
+        buffers = self.buffers
+        if buffers is None or buffers[0].shape != frame.shape or buffers[0].dtype != frame.dtype:
+            buffers = [np.empty_like(frame), np.empty_like(frame)]
+            with self.lock:
+                self.buffers = buffers
+                self.front = 0
+        back = 1 - self.front
+        np.copyto(buffers[back], frame)
+        with self.lock:
+            self.front = back
+            self.version += 1
+
+    def read(self, callback, since=-1):
+        # Calls callback(frame) with the front buffer while holding the lock
+        # and returns the new version, or None when there's nothing newer
+        # than `since`. The frame must not be kept after the callback.
+        with self.lock:
+            if self.buffers is None or self.version == since:
+                return None
+            callback(self.buffers[self.front])
+            return self.version
@@ -0,0 +1,120 @@
+import os
+import sys
+# shared/ at the repository root holds the modules the apps have in common.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import json
+import time
+import threading
+import cv2
+import numpy as np
+from pipeline import Pipeline
+from scheduler import InferenceScheduler
+from roi import RegionOfInterest
+from counting import CountingEngine
+from server_connector import ServerConnector
+from offline_buffer import OfflineBuffer
+
+# Example headless.json:
+# {"source": 0, "boundary": [[100, 240], [540, 240]], "left_to_right": true,
+#  "key": "...", "name": "...", "ip": "127.0.0.1", "port": "8080", "protocol": "http",
+#  "model": "model.pt", "backend": "onnx", "scheduler": {"cpu_budget": 0.5}, "roi": {"padding": 96},
+#  "lines": {"side door": {"points": [[0, 0], [0, 480]]}}, "zones": {"queue": [[0, 0], [200, 0], [200, 200]]}}
+DEFAULT_CONFIG = {'source': 0, 'boundary': [], 'left_to_right': True, 'key': '', 'name': '',
+                  'ip': '127.0.0.1', 'port': '8080', 'protocol': 'http', 'model': "model.pt"}
+
+class HeadlessCounter:
+    # Same counting as the Kivy app without any drawing, flipping or texture
+    # uploads: frames go from capture to the detector and, occasionally, to
+    # the controller as thumbnails.
+    def __init__(self, config, model):
+        self.config = config
+        self.model = model
+        self.left_to_right = config['left_to_right']
+        self.boundary_line = [tuple(map(float, point)) for point in config['boundary']][:2]
+        self.boundary_lock = threading.Lock()
+        self.engine = CountingEngine()
+        for name, line in config.get('lines', {}).items():
+            self.engine.set_line(name, line['points'], line.get('left_to_right', True))
+        for name, polygon in config.get('zones', {}).items():
+            self.engine.set_zone(name, polygon)
+        self.scheduler = InferenceScheduler(**config.get('scheduler', {}))
+        self.roi = RegionOfInterest(**config['roi']) if config.get('roi') is not None else None
+        server_url = f"{config['protocol']}://{config['ip']}:{config['port']}"
+        # Thumbnails are flipped like the Kivy preview, the viewers undo it.
+        self.connector = ServerConnector(server_url, config['key'], config['name'],
+                                         wire_format=config.get('wire_format', 'json'),
+                                         on_reset=self.reset_count, thumbnail_flip=0,
+                                         thumbnails=config.get('thumbnails'),
+                                         offline_buffer=OfflineBuffer(config.get('offline_buffer', "offline_counts.db")))
+        self.connector.on_command("Set Boundary", self.on_server_boundary)
+        source = config['source']
+        self.pipeline = Pipeline(int(source) if str(source).isdigit() else source, infer=self.infer,
+                                 upload=self.upload, on_error=print,
+                                 capture_backend=config.get('capture_backend', cv2.CAP_ANY))
+
+    def reset_count(self):
+        self.pipeline.reset_count()
+        self.engine.reset_counts()
+
+    def on_server_boundary(self, command):
+        with self.boundary_lock:
+            self.boundary_line = [(float(x), float(y)) for x, y in (command.get("boundary") or [])[:2]]
+
+    def infer(self, frame):
+        if not self.scheduler.should_infer(frame):
+            return None
+        started = time.perf_counter()
+        with self.boundary_lock:
+            line = list(self.boundary_line)
+        source, offset, scale = self.roi.crop(frame, line) if self.roi is not None else (frame, (0, 0), 1.0)
+        results = self.model.track(source, persist=True, tracker="bytetrack.yaml", classes=[0], verbose=False)
+        track_ids = np.empty(0, dtype=int)
+        centroids = np.empty((0, 2), dtype=np.float32)
+        if results and results[0].boxes and results[0].boxes.id is not None:
+            boxes = results[0].boxes.xyxy.cpu().numpy()
+            if source is not frame:
+                boxes = RegionOfInterest.to_frame(boxes, offset, scale)
+            track_ids = results[0].boxes.id.cpu().numpy().astype(int)
+            centroids = (boxes[:, :2] + boxes[:, 2:4]) / 2
+        # The configured boundary is the "main" line behind the people count.
+        self.engine.set_line("main", line, self.left_to_right)
+        delta = self.engine.update(track_ids, centroids).get("main", 0)
+        if delta:
+            self.pipeline.add_count(delta)
+        self.scheduler.observe(centroids.tolist(), line, started)
+        return None
+
+    def upload(self, frame):
+        # While disconnected the connector buffers samples and reconnects by itself.
+        self.connector.send_people_count(self.pipeline.get_count, frame, counters=self.engine.counters())
+
+    def run(self, stats_interval=10.0):
+        self.connector.connect()
+        self.connector.open_channel()
+        self.pipeline.start()
+        try:
+            while self.pipeline.is_running():
+                time.sleep(stats_interval)
+                print(json.dumps({"count": self.pipeline.get_count(), "counters": self.engine.counters(),
+                                  "stages": self.pipeline.snapshot(), "scheduler": self.scheduler.snapshot()}))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.pipeline.stop()
+            self.connector.close_channel()
+
+def load_config(path):
+    config = dict(DEFAULT_CONFIG)
+    with open(path, 'r') as f:
+        config.update(json.load(f))
+    return config
+
+def main(config_path="headless.json"):
+    from detector import load_detector
+
+    config = load_config(config_path)
+    model = load_detector(config['model'], config.get('backend', 'torch'))
+    HeadlessCounter(config, model).run()
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "headless.json")
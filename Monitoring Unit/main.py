@@ -1,6 +1,6 @@
 import threading
 import cv2
-from ultralytics import YOLO
+import numpy as np
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.image import Image
@@ -13,20 +13,24 @@ from kivy.uix.spinner import Spinner
 from kivy.clock import Clock
 from kivy.graphics.texture import Texture
 from kivy.properties import NumericProperty, StringProperty
-import torch
 import time
 import json
 import os, sys
+# shared/ at the repository root holds the modules the apps have in common.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 from server_connector import ServerConnector
+from detector import load_detector
+from pipeline import Pipeline
+from scheduler import InferenceScheduler
+from roi import RegionOfInterest
+from counting import CountingEngine
+from frame_buffer import FrameExchange
+from offline_buffer import OfflineBuffer
 
 boundary_line = []
 mouse_pos = None
-crossed_ids = set()
-prev_sides = {}
-current_frame = None
-stop_thread = False
 clear_boundary_flag = False
-frame_lock = threading.Lock()
+frames = FrameExchange()
 boundary_lock = threading.Lock()
 
 config = {'key': '', 'name': '', 'ip': '127.0.0.1', 'port': '8080', 'protocol': 'http'}
@@ -37,8 +41,21 @@ if os.path.exists('login.json'):
     except Exception as e:
         print(f"Error reading config file: {e}")
 
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-model = YOLO("model.pt", verbose=False).to(device)
+# "backend" may be "onnx" or "openvino" to run an exported copy of the model on CPU.
+model = load_detector(config.get('model', "model.pt"), config.get('backend', 'torch'))
+
+# Besides the drawn boundary, login.json may name extra lines
+# {"name": {"points": [[x, y], [x, y]], "left_to_right": true}} and polygon
+# zones {"name": [[x, y], ...]}; their in/out counts are sent to the controller.
+engine = CountingEngine()
+for line_name, line in config.get('lines', {}).items():
+    engine.set_line(line_name, line['points'], line.get('left_to_right', True))
+for zone_name, polygon in config.get('zones', {}).items():
+    engine.set_zone(zone_name, polygon)
+
+# Counts taken while the controller is unreachable are kept on disk and
+# replayed once it is back; "offline_buffer" in login.json names the file.
+offline_buffer = OfflineBuffer(config.get('offline_buffer', "offline_counts.db"))
 
 class LoginPopup(Popup):
     def __init__(self, on_connect, saved_config, **kwargs):
@@ -115,6 +132,9 @@ class PeopleCounterApp(App):
     people_count = NumericProperty(0)
     connection_status = StringProperty("Disconnected")
     direction_left_to_right = True
+    pipeline = None
+    scheduler = None
+    frame_version = -1
 
     def build(self):
         global config
@@ -142,6 +162,9 @@ class PeopleCounterApp(App):
         status_layout.add_widget(self.status_icon)
         status_layout.add_widget(self.status_label)
         layout.add_widget(status_layout)
+
+        self.stats_label = Label(text="", size_hint=(1, 0.05), font_size=12)
+        layout.add_widget(self.stats_label)
         
         camera_layout = BoxLayout(size_hint=(1, 0.1), spacing=10)
         camera_options = get_available_cameras()
@@ -161,6 +184,7 @@ class PeopleCounterApp(App):
         layout.add_widget(camera_layout)
         
         Clock.schedule_interval(self.update_texture, 1 / 30.0)
+        Clock.schedule_interval(self.update_stats, 1.0)
         
         if camera_options:
             self.start_video_thread()
@@ -195,27 +219,67 @@ class PeopleCounterApp(App):
             print(f"Error saving config file: {e}")
     
         server_url = f"{config['protocol']}://{config['ip']}:{config['port']}"
-        self.connector = ServerConnector(server_url, config['key'], config['name'])
-        self.connector.app = self
+        if hasattr(self, 'connector'):
+            self.connector.close_channel()
+        # Optional "thumbnails" section, e.g. {"interval": 2.0, "image_format": "webp", "quality": 70}.
+        self.connector = ServerConnector(server_url, config['key'], config['name'],
+                                         wire_format=config.get('wire_format', 'json'),
+                                         on_reset=self.on_server_reset, thumbnail_flip=0,
+                                         thumbnails=config.get('thumbnails'), offline_buffer=offline_buffer)
     
-        if self.connector.connect():
+        self.connector.on_command("Set Boundary", self.on_server_boundary)
+        connected = self.connector.connect()
+        self.connector.open_channel()
+        if connected:
             self.connection_status = f"Connected (Latency: {self.connector.latency:.2f} ms)"
         else:
             self.connection_status = "Connection Failed"
         popup.dismiss()
 
+    def on_server_boundary(self, command):
+        global mouse_pos
+        points = command.get("boundary") or []
+        with boundary_lock:
+            boundary_line.clear()
+            boundary_line.extend((float(x), float(y)) for x, y in points[:2])
+            mouse_pos = None
+
+    def show_error_popup(self, message):
+        Popup(title='Error', content=Label(text=message), size_hint=(0.6, 0.3)).open()
+
+    def on_server_reset(self):
+        if self.pipeline is not None:
+            self.pipeline.reset_count()
+        engine.reset_counts()
+
     def on_camera_select(self, spinner, text):
         if text != "No camera available":
-            global stop_thread
-            stop_thread = True
-            time.sleep(0.5)
-            stop_thread = False
             self.start_video_thread()
 
     def start_video_thread(self):
         video_source = int(self.camera_spinner.text) if self.camera_spinner.text.isdigit() else 0
-        video_thread = threading.Thread(target=process_video, args=(video_source, self))
-        video_thread.start()
+        people_count = 0
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            people_count = self.pipeline.get_count()
+        # Optional "scheduler" section in login.json, e.g. {"cpu_budget": 0.5}.
+        scheduler = InferenceScheduler(**config.get('scheduler', {}))
+        # Optional "roi" section, e.g. {"padding": 96, "upscale": true}, limits
+        # detection to a band around the boundary line.
+        roi = RegionOfInterest(**config['roi']) if config.get('roi') is not None else None
+        pipeline = Pipeline(
+            video_source,
+            infer=lambda frame: detect_and_count(frame, self, pipeline, scheduler, roi),
+            render=render_frame,
+            on_frame=frames.write,
+            upload=lambda frame: upload_frame(self, pipeline, frame),
+            on_count=lambda count: Clock.schedule_once(lambda dt: setattr(self, 'people_count', count)),
+            on_error=lambda message: Clock.schedule_once(lambda dt: self.show_error_popup(message)),
+            people_count=people_count
+        )
+        self.pipeline = pipeline
+        self.scheduler = scheduler
+        pipeline.start()
 
     def on_checkbox_active(self, checkbox, value):
         self.direction_left_to_right = value
@@ -229,95 +293,107 @@ class PeopleCounterApp(App):
         clear_boundary_flag = True
 
     def on_stop(self):
-        global stop_thread
-        stop_thread = True
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
+    def update_stats(self, dt):
+        if self.pipeline is None:
+            return
+        stats = self.pipeline.snapshot()
+        text = " | ".join(f"{name} {stage['latency_ms']:.0f} ms ({stage['dropped']} dropped)"
+                          for name, stage in stats.items() if stage["frames"])
+        if self.scheduler is not None:
+            scheduling = self.scheduler.snapshot()
+            text += f" | {scheduling['mode']} {scheduling['inference_ratio'] * 100:.0f}% frames"
+        self.stats_label.text = text
 
     def update_texture(self, dt):
-        with frame_lock:
-            if current_frame is not None:
-                texture = Texture.create(size=(current_frame.shape[1], current_frame.shape[0]), colorfmt='bgr')
-                texture.blit_buffer(current_frame.tobytes(), colorfmt='bgr', bufferfmt='ubyte')
-                self.image.texture = texture
-
-def process_video(source, app):
-    global current_frame, stop_thread, boundary_line, mouse_pos, clear_boundary_flag, crossed_ids, prev_sides
-    cap = cv2.VideoCapture(source, cv2.CAP_DSHOW)
-    if not cap.isOpened():
-        Clock.schedule_once(lambda dt: app.show_error_popup(f"Unable to open camera {source}"))
-        return
-    while cap.isOpened() and not stop_thread:
-        ret, frame = cap.read()
-        if not ret:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            continue
-        
-        results = model.track(frame, persist=True, tracker="bytetrack.yaml", verbose=False)
-        if results and results[0].boxes:
-            boxes = results[0].boxes.xyxy.cpu().numpy()
-            track_ids = results[0].boxes.id
-            classes = results[0].boxes.cls.cpu().numpy()
-            if track_ids is not None:
-                track_ids = track_ids.cpu().numpy().astype(int)
-                for i, box in enumerate(boxes):
-                    if classes[i] == 0:
-                        x1, y1, x2, y2 = map(int, box[:4])
-                        track_id = track_ids[i]
-                        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
-                        cv2.circle(frame, (cx, cy), 5, (0, 255, 0), -1)
-                        cv2.putText(frame, f"ID: {track_id}", (x1, y1 - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
-
-                        with boundary_lock:
-                            if len(boundary_line) == 2:
-                                A, B = boundary_line
-                                AB = (B[0] - A[0], B[1] - A[1])
-                                P = (cx, cy)
-                                AP = (P[0] - A[0], P[1] - A[1])
-                                cross = AB[0] * AP[1] - AB[1] * AP[0]
-                                side = 1 if cross > 0 else -1 if cross < 0 else 0
-                                if track_id in prev_sides:
-                                    prev_side = prev_sides[track_id]
-                                    if prev_side != 0 and side != 0 and prev_side != side:
-                                        direction = "left_to_right" if prev_side == -1 and side == 1 else "right_to_left"
-                                        if app.direction_left_to_right:
-                                            if direction == "left_to_right":
-                                                Clock.schedule_once(lambda dt: setattr(app, 'people_count', app.people_count + 1))
-                                            else:
-                                                Clock.schedule_once(lambda dt: setattr(app, 'people_count', max(0, app.people_count - 1)))
-                                        else:
-                                            if direction == "right_to_left":
-                                                Clock.schedule_once(lambda dt: setattr(app, 'people_count', app.people_count + 1))
-                                            else:
-                                                Clock.schedule_once(lambda dt: setattr(app, 'people_count', max(0, app.people_count - 1)))
-                                prev_sides[track_id] = side
-
-        if clear_boundary_flag:
-            with boundary_lock:
-                boundary_line.clear()
-                mouse_pos = None
-            crossed_ids.clear()
-            prev_sides.clear()
-            Clock.schedule_once(lambda dt: setattr(app, 'people_count', 0))
-            clear_boundary_flag = False
+        # The texture is only re-uploaded when a new frame was published.
+        version = frames.read(self.blit_frame, self.frame_version)
+        if version is not None:
+            self.frame_version = version
+            self.image.canvas.ask_update()
+
+    def blit_frame(self, frame):
+        texture = self.image.texture
+        if texture is None or tuple(texture.size) != (frame.shape[1], frame.shape[0]):
+            texture = Texture.create(size=(frame.shape[1], frame.shape[0]), colorfmt='bgr')
+            # OpenCV rows run top-down and texture rows bottom-up, flipping the
+            # texture coordinates once replaces a cv2.flip per frame.
+            texture.flip_vertical()
+            self.image.texture = texture
+        texture.blit_buffer(frame.reshape(-1), colorfmt='bgr', bufferfmt='ubyte')
+
+def detect_and_count(frame, app, pipeline, scheduler, roi=None):
+    global boundary_line, mouse_pos, clear_boundary_flag
+    if not clear_boundary_flag and not scheduler.should_infer(frame):
+        # Skipped frames keep showing the last detections.
+        return scheduler.last_detections
+    detections = []
+    started = time.perf_counter()
+    with boundary_lock:
+        line = list(boundary_line)
+    source, offset, scale = roi.crop(frame, line) if roi is not None else (frame, (0, 0), 1.0)
+    results = model.track(source, persist=True, tracker="bytetrack.yaml", verbose=False)
+    track_ids = np.empty(0, dtype=int)
+    centroids = np.empty((0, 2), dtype=np.float32)
+    if results and results[0].boxes and results[0].boxes.id is not None:
+        boxes = results[0].boxes.xyxy.cpu().numpy()
+        if source is not frame:
+            boxes = RegionOfInterest.to_frame(boxes, offset, scale)
+        people = results[0].boxes.cls.cpu().numpy() == 0
+        boxes = boxes[people]
+        track_ids = results[0].boxes.id.cpu().numpy().astype(int)[people]
+        centroids = (boxes[:, :2] + boxes[:, 2:4]) / 2
+        detections = [(*map(int, box[:4]), track_id) for box, track_id in zip(boxes, track_ids)]
 
+    # The drawn boundary is the "main" line and drives the app's people count;
+    # extra lines and zones from login.json are only reported to the controller.
+    engine.set_line("main", line, app.direction_left_to_right)
+    delta = engine.update(track_ids, centroids).get("main", 0)
+    if delta:
+        pipeline.add_count(delta)
+
+    if clear_boundary_flag:
         with boundary_lock:
-            if len(boundary_line) == 1 and mouse_pos is not None:
-                cv2.line(frame, (int(boundary_line[0][0]), int(boundary_line[0][1])), 
-                         (int(mouse_pos[0]), int(mouse_pos[1])), (0, 255, 0), 2)
-            elif len(boundary_line) == 2:
-                cv2.line(frame, (int(boundary_line[0][0]), int(boundary_line[0][1])), 
-                         (int(boundary_line[1][0]), int(boundary_line[1][1])), (0, 0, 255), 2)
-
-        frame = cv2.flip(frame, 0)
-        with frame_lock:
-            current_frame = frame.copy()
-            
-        if hasattr(app, 'connector') and app.connector.connected:
-            if not app.connector.send_people_count(app.people_count, frame):
-                app.connection_status = "Disconnected"
-
-    cap.release()
+            boundary_line.clear()
+            mouse_pos = None
+        engine.clear()
+        engine.reset_counts()
+        pipeline.reset_count()
+        clear_boundary_flag = False
+
+    scheduler.observe(centroids.tolist(), line, started)
+    scheduler.last_detections = detections
+    return detections
+
+def render_frame(frame, detections):
+    for x1, y1, x2, y2, track_id in detections:
+        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
+        cv2.circle(frame, (cx, cy), 5, (0, 255, 0), -1)
+        cv2.putText(frame, f"ID: {track_id}", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+
+    with boundary_lock:
+        if len(boundary_line) == 1 and mouse_pos is not None:
+            cv2.line(frame, (int(boundary_line[0][0]), int(boundary_line[0][1])), 
+                     (int(mouse_pos[0]), int(mouse_pos[1])), (0, 255, 0), 2)
+        elif len(boundary_line) == 2:
+            cv2.line(frame, (int(boundary_line[0][0]), int(boundary_line[0][1])), 
+                     (int(boundary_line[1][0]), int(boundary_line[1][1])), (0, 0, 255), 2)
+
+    return frame
+
+def upload_frame(app, pipeline, frame):
+    # While disconnected the connector keeps buffering samples and reconnects
+    # in the background; the status follows whatever it reports.
+    if hasattr(app, 'connector'):
+        if app.connector.send_people_count(pipeline.get_count, frame, counters=engine.counters()):
+            if app.connection_status == "Disconnected":
+                app.connection_status = f"Connected (Latency: {app.connector.latency:.2f} ms)"
+        else:
+            app.connection_status = "Disconnected"
 
 if __name__ == "__main__":
     PeopleCounterApp().run()
\ No newline at end of file
@@ -0,0 +1,220 @@
+import os
+import sys
+# shared/ at the repository root holds the modules the apps have in common.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import json
+import time
+import threading
+import cv2
+import numpy as np
+from pipeline import DropOldestQueue, StageStats
+from counting import CountingEngine
+
+def create_tracker(tracker="bytetrack.yaml", frame_rate=30):
+    # Same construction model.track uses, but one instance per stream so the
+    # streams can share a single batched forward pass.
+    from ultralytics.utils import IterableSimpleNamespace, yaml_load
+    from ultralytics.utils.checks import check_yaml
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    cfg = IterableSimpleNamespace(**yaml_load(check_yaml(tracker)))
+    return BYTETracker(args=cfg, frame_rate=frame_rate)
+
+class Stream:
+    def __init__(self, source, key=None, name=None, boundary=None, left_to_right=True, lines=None,
+                 zones=None, tracker="bytetrack.yaml", capture_backend=cv2.CAP_ANY):
+        self.source = source
+        self.key = key
+        self.name = name
+        self.boundary_line = [tuple(map(float, point)) for point in (boundary or [])][:2]
+        self.left_to_right = left_to_right
+        self.capture_backend = capture_backend
+        self.tracker = create_tracker(tracker)
+        self.engine = CountingEngine()
+        for line_name, line in (lines or {}).items():
+            self.engine.set_line(line_name, line['points'], line.get('left_to_right', True))
+        for zone_name, polygon in (zones or {}).items():
+            self.engine.set_zone(zone_name, polygon)
+        self.people_count = 0
+        self.lock = threading.Lock()
+        self.queue = DropOldestQueue()
+        self.latest_frame = None
+        self.stats = StageStats(f"capture {source}")
+        self.stats.queue = self.queue
+
+    def get_count(self):
+        with self.lock:
+            return self.people_count
+
+    def reset_count(self):
+        with self.lock:
+            self.people_count = 0
+            self.engine.reset_counts()
+
+    def set_boundary(self, points):
+        with self.lock:
+            self.boundary_line = [tuple(map(float, point)) for point in points][:2]
+
+    def get_counters(self):
+        with self.lock:
+            return self.engine.counters()
+
+    def update(self, tracks):
+        # tracks: BYTETracker output rows [x1, y1, x2, y2, track_id, score, cls, idx].
+        with self.lock:
+            self.engine.set_line("main", self.boundary_line, self.left_to_right)
+            delta = self.engine.update(tracks[:, 4].astype(int), (tracks[:, :2] + tracks[:, 2:4]) / 2).get("main", 0)
+            if delta:
+                self.people_count = max(0, self.people_count + delta)
+
+class MultiStreamCounter:
+    # Runs several sources through one model. Each capture thread keeps only
+    # its newest frame; the inference thread gathers one frame per stream
+    # (waiting at most batch_timeout for stragglers), runs a single batched
+    # predict and feeds every stream's detections to its own ByteTrack.
+    def __init__(self, model, streams, connector=None, classes=(0,), batch_timeout=0.02,
+                 upload_interval=0.2, **predict_args):
+        self.model = model
+        self.streams = streams
+        self.connector = connector
+        self.classes = list(classes)
+        self.batch_timeout = batch_timeout
+        self.upload_interval = upload_interval
+        self.predict_args = predict_args
+        self.stats = {"infer": StageStats("infer"), "upload": StageStats("upload")}
+        self._frame_ready = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        workers = [(self._capture_loop, (stream,)) for stream in self.streams]
+        workers.append((self._infer_loop, ()))
+        if self.connector is not None:
+            workers.append((self._upload_loop, ()))
+        for target, args in workers:
+            thread = threading.Thread(target=target, args=args, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=2.0):
+        self._stopped.set()
+        self._frame_ready.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def snapshot(self):
+        stats = {stream.stats.name: stream.stats.snapshot() for stream in self.streams}
+        stats.update({name: stage.snapshot() for name, stage in self.stats.items()})
+        stats["counts"] = {stream.name or str(stream.source): stream.get_count() for stream in self.streams}
+        return stats
+
+    def _capture_loop(self, stream):
+        cap = cv2.VideoCapture(stream.source, stream.capture_backend)
+        if not cap.isOpened():
+            print(f"Unable to open camera {stream.source}")
+            return
+        try:
+            while not self._stopped.is_set() and cap.isOpened():
+                started = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                stream.stats.record(started, started)
+                stream.queue.put((frame, started))
+                self._frame_ready.set()
+        finally:
+            cap.release()
+
+    def _gather(self):
+        deadline = time.perf_counter() + self.batch_timeout
+        while not self._stopped.is_set():
+            if all(stream.queue.items for stream in self.streams) or time.perf_counter() >= deadline:
+                break
+            time.sleep(0.002)
+        batch = []
+        for stream in self.streams:
+            item = stream.queue.get(timeout=0)
+            if item is not None:
+                batch.append((stream, item[0], item[1]))
+        return batch
+
+    def _infer_loop(self):
+        stats = self.stats["infer"]
+        empty = np.empty((0, 8), dtype=np.float32)
+        while not self._stopped.is_set():
+            if not self._frame_ready.wait(0.5):
+                continue
+            self._frame_ready.clear()
+            batch = self._gather()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            results = self.model.predict([frame for _, frame, _ in batch], classes=self.classes,
+                                         verbose=False, **self.predict_args)
+            for (stream, frame, _), result in zip(batch, results):
+                det = result.boxes.cpu().numpy()
+                tracks = stream.tracker.update(det, frame) if len(det) else empty
+                stream.update(tracks)
+                stream.latest_frame = frame
+            stats.record(started, min(captured for _, _, captured in batch))
+
+    def _upload_loop(self):
+        stats = self.stats["upload"]
+        while not self._stopped.wait(self.upload_interval):
+            started = time.perf_counter()
+            for stream in self.streams:
+                self.connector.send_people_count(stream.get_count, stream.latest_frame, stream.key, stream.name,
+                                                 counters=stream.get_counters())
+            self.connector.flush()
+            stats.record(started, started)
+
+def main(config_path="login.json"):
+    from detector import load_detector
+    from server_connector import ServerConnector
+    from offline_buffer import OfflineBuffer
+
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    streams = [Stream(**stream) for stream in config.get('streams', [])]
+    if not streams:
+        print(f"No streams configured in {config_path}")
+        return
+
+    # Exported backends take up to one frame per stream in a batch.
+    model = load_detector(config.get('model', "model.pt"), config.get('backend', 'torch'), batch=len(streams))
+
+    server_url = f"{config['protocol']}://{config['ip']}:{config['port']}"
+    primary = streams[0]
+    # Thumbnails are flipped like the Kivy preview, the viewers undo it.
+    connector = ServerConnector(server_url, primary.key, primary.name, batch_size=len(streams),
+                                on_reset=primary.reset_count, thumbnail_flip=0,
+                                thumbnails=config.get('thumbnails'),
+                                offline_buffer=OfflineBuffer(config.get('offline_buffer', "offline_counts.db")))
+    for stream in streams[1:]:
+        connector.add_monitor(stream.key, stream.name, on_reset=stream.reset_count)
+    # Commands are tagged with the monitor whose channel delivered them.
+    by_monitor = {(stream.key, stream.name): stream for stream in streams}
+
+    def set_boundary(command):
+        stream = by_monitor.get((command.get("key"), command.get("name")), primary)
+        stream.set_boundary(command.get("boundary") or [])
+
+    connector.on_command("Set Boundary", set_boundary)
+    connector.connect()
+    connector.open_channel()
+
+    counter = MultiStreamCounter(model, streams, connector)
+    counter.start()
+    try:
+        while True:
+            time.sleep(10)
+            print(json.dumps(counter.snapshot()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        counter.stop()
+        connector.close_channel()
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "login.json")
@@ -0,0 +1,51 @@
+import sqlite3
+import threading
+
+class OfflineBuffer:
+    # Durable ring buffer of count samples taken while the controller is
+    # unreachable. Samples survive restarts of the Monitoring Unit; once more
+    # than `capacity` are stored the oldest are dropped.
+    def __init__(self, path="offline_counts.db", capacity=200000):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS samples (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                name TEXT NOT NULL,
+                people_count INTEGER NOT NULL,
+                ts REAL NOT NULL
+            )
+        ''')
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM samples').fetchone()[0]
+
+    def append(self, key, name, people_count, ts):
+        with self.lock:
+            cursor = self.conn.execute('INSERT INTO samples (key, name, people_count, ts) VALUES (?, ?, ?, ?)',
+                                       (key, name, people_count, ts))
+            # Ids only grow, so everything older than the newest `capacity` rows goes.
+            self.conn.execute('DELETE FROM samples WHERE id <= ?', (cursor.lastrowid - self.capacity,))
+            self.conn.commit()
+
+    def peek(self, limit=500):
+        # Oldest samples first, as (id, record) with the /update_counts record fields.
+        with self.lock:
+            rows = self.conn.execute('SELECT id, key, name, people_count, ts FROM samples ORDER BY id LIMIT ?',
+                                     (limit,)).fetchall()
+        return [(row[0], {'key': row[1], 'name': row[2], 'people_count': row[3], 'ts': row[4]}) for row in rows]
+
+    def discard(self, up_to_id):
+        with self.lock:
+            self.conn.execute('DELETE FROM samples WHERE id <= ?', (up_to_id,))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import deque
+import cv2
+
+class DropOldestQueue:
+    # Bounded hand-off between stages. A full queue discards its oldest item,
+    # so a slow consumer sees the newest frame instead of falling behind.
+    def __init__(self, maxsize=1):
+        self.items = deque(maxlen=maxsize)
+        self.dropped = 0
+        self.closed = False
+        self._ready = threading.Condition()
+
+    def put(self, item):
+        with self._ready:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        with self._ready:
+            if not self.items and not self.closed:
+                self._ready.wait(timeout)
+            return self.items.popleft() if self.items else None
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+class StageStats:
+    def __init__(self, name, smoothing=0.1):
+        self.name = name
+        self.smoothing = smoothing
+        self.frames = 0
+        self.latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        # Time from capture to the end of this stage.
+        self.age_ms = 0.0
+        self.queue = None
+
+    def record(self, started, captured):
+        now = time.perf_counter()
+        latency = (now - started) * 1000
+        age = (now - captured) * 1000
+        if self.frames == 0:
+            self.latency_ms, self.age_ms = latency, age
+        else:
+            self.latency_ms += self.smoothing * (latency - self.latency_ms)
+            self.age_ms += self.smoothing * (age - self.age_ms)
+        self.max_latency_ms = max(self.max_latency_ms, latency)
+        self.frames += 1
+
+    def snapshot(self):
+        return {
+            "frames": self.frames,
+            "dropped": self.queue.dropped if self.queue is not None else 0,
+            "latency_ms": round(self.latency_ms, 2),
+            "max_latency_ms": round(self.max_latency_ms, 2),
+            "age_ms": round(self.age_ms, 2),
+        }
+
+# Capture -> inference -> render -> upload, each stage on its own thread.
+# infer(frame) runs detection/tracking and returns whatever render(frame,
+# result) needs; counting happens there through add_count/reset_count. render
+# returns the frame to show and is optional. on_frame receives every rendered
+# frame and upload(frame) is called with the newest one whenever the previous
+# upload has finished, so a slow controller never holds up inference.
+class Pipeline:
+    STAGES = ("capture", "infer", "render", "upload")
+
+    def __init__(self, source, infer, render=None, upload=None, on_frame=None, on_count=None,
+                 on_error=None, people_count=0, capture_backend=cv2.CAP_DSHOW):
+        self.source = source
+        self.infer = infer
+        self.render = render
+        self.upload = upload
+        self.on_frame = on_frame
+        self.on_count = on_count
+        self.on_error = on_error
+        self.capture_backend = capture_backend
+        self.people_count = people_count
+        self._count_lock = threading.Lock()
+        self.stats = {name: StageStats(name) for name in self.STAGES}
+        self.infer_queue = DropOldestQueue()
+        self.render_queue = DropOldestQueue()
+        self.upload_queue = DropOldestQueue()
+        self.stats["infer"].queue = self.infer_queue
+        self.stats["render"].queue = self.render_queue
+        self.stats["upload"].queue = self.upload_queue
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def get_count(self):
+        with self._count_lock:
+            return self.people_count
+
+    def add_count(self, delta):
+        with self._count_lock:
+            self.people_count = max(0, self.people_count + delta)
+            count = self.people_count
+        if self.on_count is not None:
+            self.on_count(count)
+
+    def reset_count(self):
+        with self._count_lock:
+            self.people_count = 0
+        if self.on_count is not None:
+            self.on_count(0)
+
+    def start(self):
+        workers = [self._capture_loop, self._infer_loop]
+        if self.render is not None or self.on_frame is not None:
+            workers.append(self._render_loop)
+        if self.upload is not None:
+            workers.append(self._upload_loop)
+        for worker in workers:
+            thread = threading.Thread(target=worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=2.0):
+        self._stopped.set()
+        for queue in (self.infer_queue, self.render_queue, self.upload_queue):
+            queue.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+
+    def is_running(self):
+        return not self._stopped.is_set()
+
+    def snapshot(self):
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+    def _capture_loop(self):
+        cap = cv2.VideoCapture(self.source, self.capture_backend)
+        if not cap.isOpened():
+            if self.on_error is not None:
+                self.on_error(f"Unable to open camera {self.source}")
+            self.stop()
+            return
+        stats = self.stats["capture"]
+        try:
+            while not self._stopped.is_set() and cap.isOpened():
+                started = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                stats.record(started, started)
+                self.infer_queue.put((frame, started))
+        finally:
+            cap.release()
+
+    def _infer_loop(self):
+        stats = self.stats["infer"]
+        rendering = self.render is not None or self.on_frame is not None
+        while not self._stopped.is_set():
+            item = self.infer_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            frame, captured = item
+            started = time.perf_counter()
+            result = self.infer(frame)
+            stats.record(started, captured)
+            if rendering:
+                self.render_queue.put((frame, result, captured))
+            elif self.upload is not None:
+                self.upload_queue.put((frame, captured))
+
+    def _render_loop(self):
+        stats = self.stats["render"]
+        while not self._stopped.is_set():
+            item = self.render_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            frame, result, captured = item
+            started = time.perf_counter()
+            if self.render is not None:
+                frame = self.render(frame, result)
+            if self.on_frame is not None:
+                self.on_frame(frame)
+            stats.record(started, captured)
+            if self.upload is not None:
+                self.upload_queue.put((frame, captured))
+
+    def _upload_loop(self):
+        stats = self.stats["upload"]
+        while not self._stopped.is_set():
+            item = self.upload_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            frame, captured = item
+            started = time.perf_counter()
+            try:
+                self.upload(frame)
+            except Exception as e:
+                print(f"Upload error: {e}")
+            stats.record(started, captured)
@@ -0,0 +1,57 @@
+import cv2
+import numpy as np
+
+class RegionOfInterest:
+    # Crops frames to a padded band around the two-point boundary line so the
+    # detector only sees the area where crossings can happen. padding is in
+    # pixels (or a fraction of the frame height when below 1). With upscale,
+    # small crops are resized so their long side matches the model input size.
+    def __init__(self, padding=96, upscale=False, imgsz=640, align=32):
+        self.padding = padding
+        self.upscale = upscale
+        self.imgsz = imgsz
+        self.align = align
+        self._key = None
+        self.box = None
+
+    def region(self, boundary_line, frame_shape):
+        height, width = frame_shape[:2]
+        key = (tuple(map(tuple, boundary_line)), height, width)
+        if key == self._key:
+            return self.box
+        padding = self.padding * height if self.padding < 1 else self.padding
+        xs = [p[0] for p in boundary_line]
+        ys = [p[1] for p in boundary_line]
+        x0, x1 = int(min(xs) - padding), int(max(xs) + padding)
+        y0, y1 = int(min(ys) - padding), int(max(ys) + padding)
+        # Grow to a multiple of the model stride so the letterbox adds no padding.
+        x1 += -(x1 - x0) % self.align
+        y1 += -(y1 - y0) % self.align
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(width, x1), min(height, y1)
+        self.box = (x0, y0, x1, y1) if x1 > x0 and y1 > y0 else (0, 0, width, height)
+        self._key = key
+        return self.box
+
+    def crop(self, frame, boundary_line):
+        # Returns (crop, (x0, y0), scale); crops are views, no copy is made.
+        if len(boundary_line) != 2:
+            return frame, (0, 0), 1.0
+        x0, y0, x1, y1 = self.region(boundary_line, frame.shape)
+        crop = frame[y0:y1, x0:x1]
+        scale = 1.0
+        if self.upscale:
+            longest = max(crop.shape[0], crop.shape[1])
+            if longest < self.imgsz:
+                scale = self.imgsz / longest
+                crop = cv2.resize(crop, (round(crop.shape[1] * scale), round(crop.shape[0] * scale)),
+                                  interpolation=cv2.INTER_LINEAR)
+        return crop, (x0, y0), scale
+
+    @staticmethod
+    def to_frame(boxes, offset, scale):
+        # Maps (N, 4) xyxy boxes from crop to frame coordinates.
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if scale != 1.0:
+            boxes = boxes / scale
+        return boxes + np.array([offset[0], offset[1], offset[0], offset[1]], dtype=np.float32)
@@ -0,0 +1,105 @@
+import time
+import cv2
+import numpy as np
+
+def distances_to_segment(points, a, b):
+    # points: (N, 2) array, a/b: segment end points. Returns (N,) distances.
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    a = np.asarray(a, dtype=np.float32)
+    ab = np.asarray(b, dtype=np.float32) - a
+    length = float(ab @ ab)
+    if length == 0:
+        return np.linalg.norm(points - a, axis=1)
+    t = np.clip(((points - a) @ ab) / length, 0.0, 1.0)
+    return np.linalg.norm(points - (a + t[:, None] * ab), axis=1)
+
+class InferenceScheduler:
+    # Decides per frame whether the detector runs:
+    #   full   - tracks are close to the boundary line, detect every frame
+    #   stride - people or motion in view, detect every `stride` frames
+    #   motion - empty and static scene, only a frame-difference check runs and
+    #            the detector every `idle_stride` frames as a safety net
+    # cpu_budget is the share of one core the detector may use outside of
+    # full mode, e.g. 0.25 lets four cameras share a core when nothing is near
+    # a line. Full mode ignores it so crossings are never missed.
+    FULL = "full"
+    STRIDE = "stride"
+    MOTION = "motion"
+
+    def __init__(self, stride=3, idle_stride=15, motion_threshold=0.01, near_line=80.0,
+                 cpu_budget=1.0, diff_size=(64, 48)):
+        self.stride = max(1, int(stride))
+        self.idle_stride = max(self.stride, int(idle_stride))
+        self.motion_threshold = motion_threshold
+        self.near_line = near_line
+        self.cpu_budget = min(1.0, max(0.01, cpu_budget))
+        self.diff_size = tuple(diff_size)
+        self.mode = self.MOTION
+        self.motion = 0.0
+        self.active_tracks = 0
+        self.line_distance = None
+        self.inference_cost = 0.0
+        self.frames = 0
+        self.inferred = 0
+        self.last_detections = []
+        self._previous = None
+        self._frames_since = None
+        self._last_inference = 0.0
+
+    def _measure_motion(self, frame):
+        small = cv2.resize(frame, self.diff_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if self._previous is None:
+            motion = 1.0
+        else:
+            motion = float(cv2.absdiff(small, self._previous).mean()) / 255.0
+        self._previous = small
+        return motion
+
+    def should_infer(self, frame, now=None):
+        now = now if now is not None else time.perf_counter()
+        self.frames += 1
+        self.motion = self._measure_motion(frame)
+        if self._frames_since is None:
+            self.mode = self.FULL
+            return True
+        self._frames_since += 1
+
+        if self.line_distance is not None and self.line_distance <= self.near_line:
+            self.mode = self.FULL
+        elif self.active_tracks or self.motion >= self.motion_threshold:
+            self.mode = self.STRIDE
+        else:
+            self.mode = self.MOTION
+
+        if self.mode == self.FULL:
+            return True
+        if self._frames_since < (self.stride if self.mode == self.STRIDE else self.idle_stride):
+            return False
+        # Spread the remaining detector runs so they stay within the budget.
+        idle_time = self.inference_cost * (1.0 / self.cpu_budget - 1.0)
+        return now - self._last_inference >= idle_time
+
+    def observe(self, centroids, boundary_line, started, finished=None):
+        # Called after every detector run with the person centroids it found.
+        finished = finished if finished is not None else time.perf_counter()
+        cost = finished - started
+        self.inference_cost = cost if not self.inferred else self.inference_cost + 0.2 * (cost - self.inference_cost)
+        self.inferred += 1
+        self._frames_since = 0
+        self._last_inference = finished
+        self.active_tracks = len(centroids)
+        if centroids and len(boundary_line) == 2:
+            self.line_distance = float(distances_to_segment(centroids, *boundary_line).min())
+        else:
+            self.line_distance = None
+
+    def snapshot(self):
+        return {
+            "mode": self.mode,
+            "motion": round(self.motion, 4),
+            "active_tracks": self.active_tracks,
+            "inference_ratio": round(self.inferred / self.frames, 3) if self.frames else 0.0,
+            "inference_ms": round(self.inference_cost * 1000, 2),
+        }
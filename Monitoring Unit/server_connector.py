@@ -1,63 +1,445 @@
 import requests
+import threading
 import time
-import base64
 import json
-import cv2
-from kivy.clock import Clock
+from thumbnail_encoder import ThumbnailEncoder
+from shared.http_session import create_session
+from shared import wire
 
 class ServerConnector:
-    def __init__(self, server_url, key, name):
+
+    def __init__(self, server_url, key, name, batch_size=1, wire_format="json", on_reset=None,
+                 thumbnail_flip=None, thumbnails=None, offline_buffer=None, timeout=(3.05, 10), pool_size=4,
+                 retries=2):
         self.server_url = server_url
         self.key = key
         self.name = name
         self.connected = False
         self.latency = None
-        self.request_count = 0
+        # batch_size > 1 queues counts from every registered monitor and sends
+        # them to /update_counts in one request.
+        self.batch_size = batch_size
+        self.pending = []
+        self.monitors = {(key, name): on_reset}
+        # Persistent channel: commands stream in on a long-lived GET while
+        # counts go out as small deltas over one keep-alive session.
+        self.session_id = None
+        self.epoch = 0
+        # Secondary monitors get their own session, epoch and channel;
+        # the primary's stay in session_id and epoch above.
+        self.sessions = {}
+        self.epochs = {}
+        self.lost_monitors = set()
+        self.channel_enabled = False
+        self.channel_open = False
+        self.command_handlers = {}
+        self.keepalive_interval = 5.0
+        # All short requests share one pooled keep-alive session, so updates
+        # don't pay a TCP/TLS handshake each. timeout is (connect, read) and
+        # bounds how long a send can hold up the caller.
+        self.timeout = timeout
+        self.http = create_session(pool_size, retries)
+        self.last_sent_count = None
+        self.last_push_time = 0
+        self.last_sent_counters = None
+        self._channel_threads = {}
+        # "binary" sends channel updates as wire.COUNT_FRAME instead of JSON.
+        self.wire_format = wire_format
+        # Thumbnails are encoded and uploaded off the caller's thread, see
+        # ThumbnailEncoder for the options in `thumbnails`. thumbnail_flip is
+        # a cv2.flip code for callers that don't flip frames themselves; a
+        # "flip" in `thumbnails` (the config) takes precedence over it.
+        self.thumbnails = ThumbnailEncoder(self._upload_thumbnail, **{"flip": thumbnail_flip, **(thumbnails or {})})
+        self.thumbnail_http = create_session(1, retries)
+        # While the controller is unreachable, one sample per monitor every
+        # offline_interval seconds goes to offline_buffer (an OfflineBuffer);
+        # a background thread reconnects with backoff and replays them.
+        self.offline_buffer = offline_buffer
+        self.offline_interval = 1.0
+        self.last_offline_sample = {}
+        self.max_backoff = 60.0
+        self.replay_batch_size = 500
+        self._reconnect_thread = None
+        self._closed = threading.Event()
+
+    def add_monitor(self, key, name, on_reset=None):
+        self.monitors[(key, name)] = on_reset
 
     def connect(self):
-        data = {'key': self.key, 'name': self.name}
+        connected = False
+        for monitor in list(self.monitors):
+            ok = self._connect_monitor(*monitor)
+            if monitor == (self.key, self.name):
+                connected = ok
+            elif ok:
+                self.lost_monitors.discard(monitor)
+            else:
+                self.lost_monitors.add(monitor)
+        self.connected = connected
+        if not connected or self.lost_monitors or (self.offline_buffer is not None and len(self.offline_buffer)):
+            self._start_reconnect()
+        return connected
+
+    def _set_disconnected(self, key=None, name=None):
+        # A lost secondary monitor is re-registered on its own, the
+        # primary's connection state is left alone.
+        monitor = (key or self.key, name or self.name)
+        if monitor == (self.key, self.name):
+            self.connected = False
+        else:
+            self.lost_monitors.add(monitor)
+        self._start_reconnect()
+
+    @staticmethod
+    def _lost_registration(response):
+        # 403 means the controller no longer knows this monitor or session
+        # (e.g. it restarted, its state is in memory); 5xx that it's failing.
+        # Both are handled like a lost connection: buffer and re-register.
+        return response.status_code == 403 or response.status_code >= 500
+
+    def _start_reconnect(self):
+        if self._closed.is_set():
+            return
+        if self._reconnect_thread is None or not self._reconnect_thread.is_alive():
+            self._reconnect_thread = threading.Thread(target=self._reconnect_loop, daemon=True)
+            self._reconnect_thread.start()
+
+    def _reconnect_loop(self):
+        # Runs until every monitor is registered and the offline buffer is
+        # empty, or until closed.
+        backoff = 1.0
+        while not self._closed.is_set():
+            if not self.connected:
+                if self.connect():
+                    print("Reconnected to the controller")
+                    if self.channel_enabled:
+                        self.open_channel()
+            elif self.lost_monitors:
+                for key, name in list(self.lost_monitors):
+                    if self._connect_monitor(key, name):
+                        self.lost_monitors.discard((key, name))
+                        print(f"Reconnected to the controller ({name})")
+                if self.channel_enabled:
+                    self.open_channel()
+            if self.connected and self.replay_offline() and not self.lost_monitors:
+                return
+            if self._closed.wait(backoff):
+                return
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _buffer_sample(self, key, name, people_count):
+        if self.offline_buffer is None:
+            return
+        now = time.time()
+        if now - self.last_offline_sample.get((key, name), 0) < self.offline_interval:
+            return
+        self.last_offline_sample[(key, name)] = now
+        if callable(people_count):
+            people_count = people_count()
+        self.offline_buffer.append(key, name, people_count, now)
+
+    def replay_offline(self):
+        # Sends buffered samples to /update_counts oldest first. They are
+        # flagged as replayed, so the controller only adds them to the
+        # occupancy history and leaves the live counts alone.
+        if self.offline_buffer is None:
+            return True
+        while not self._closed.is_set():
+            rows = self.offline_buffer.peek(self.replay_batch_size)
+            if not rows:
+                return True
+            records = [dict(record, replay=True) for _, record in rows]
+            try:
+                response = self.http.post(f"{self.server_url}/update_counts", json={'records': records},
+                                          timeout=self.timeout, verify=True)
+            except Exception as e:
+                print(f"Error while replaying buffered counts: {e}")
+                self.connected = False
+                return False
+            if response.status_code >= 500:
+                print(f"Error replaying buffered counts: {response.status_code} - {response.text}")
+                return False
+            if response.status_code != 200:
+                # Retrying a rejected batch can't succeed, drop it.
+                print(f"Buffered counts rejected: {response.status_code} - {response.text}")
+            self.offline_buffer.discard(rows[-1][0])
+            print(f"Replayed {len(rows)} buffered counts")
+        return False
+
+    def _connect_monitor(self, key, name):
+        data = {'key': key, 'name': name}
         try:
             start_time = time.time()
-            response = requests.post(f"{self.server_url}/connect", json=data, verify=True)
-            self.latency = (time.time() - start_time) * 1000
+            response = self.http.post(f"{self.server_url}/connect", json=data, timeout=self.timeout, verify=True)
+            latency = (time.time() - start_time) * 1000
+            if (key, name) == (self.key, self.name):
+                self.latency = latency
             if response.status_code == 200:
-                self.connected = True
-                print("Connection successful!")
+                resp_data = response.json()
+                if (key, name) == (self.key, self.name):
+                    self.session_id = resp_data.get("session")
+                    self.epoch = resp_data.get("epoch", 0)
+                    self.last_sent_count = None
+                else:
+                    self.sessions[(key, name)] = resp_data.get("session")
+                    self.epochs[(key, name)] = resp_data.get("epoch", 0)
+                print(f"Connection successful! ({name})")
                 return True
-            print("Connection failed!")
+            print(f"Connection failed! ({name})")
             return False
         except Exception as e:
             print(f"Connection error: {e}")
             return False
 
-    def send_people_count(self, people_count, frame=None):
-        if not self.connected:
-            print("Not connected, unable to send data!")
-            return False
-        data = {'key': self.key, 'name': self.name, 'people_count': people_count}
-        self.request_count += 1
-        if self.request_count % 10 == 0 and frame is not None:
-            width = 320
-            height = int(frame.shape[0] * (width / frame.shape[1]))
-            resized_frame = cv2.resize(frame, (width, height))
-            success, encoded_image = cv2.imencode('.png', resized_frame)
-            if success:
-                image_base64 = base64.b64encode(encoded_image).decode('utf-8')
-                data['image'] = image_base64
+    def _handle_reset(self, key, name, epoch=None):
+        if epoch is not None:
+            # Replayed or duplicated resets must not zero a fresh count. The
+            # epoch is adopted whichever path the reset came in on, so later
+            # channel deltas carry the one the controller expects.
+            if (key, name) == (self.key, self.name):
+                if epoch <= self.epoch:
+                    return
+                self.epoch = epoch
+            else:
+                if epoch <= self.epochs.get((key, name), 0):
+                    return
+                self.epochs[(key, name)] = epoch
+        on_reset = self.monitors.get((key, name))
+        if on_reset is not None:
+            on_reset()
+        if (key, name) == (self.key, self.name):
+            self.last_sent_count = None
+
+    def on_command(self, action, handler):
+        self.command_handlers[action] = handler
+
+    def _session(self, monitor):
+        if monitor == (self.key, self.name):
+            return self.session_id
+        return self.sessions.get(monitor)
+
+    def _dispatch_command(self, command, monitor=None):
+        # Handlers get the command tagged with the monitor whose channel it
+        # came in on, so multi-stream callers can route it to that stream.
+        key, name = monitor or (self.key, self.name)
+        action = command.get("action")
+        if action == "Reset Counter":
+            self._handle_reset(key, name, command.get("epoch"))
+        elif action in self.command_handlers:
+            self.command_handlers[action](dict(command, key=key, name=name))
+
+    def open_channel(self):
+        # One channel per registered monitor; already running ones are kept.
+        # The intent is recorded even while disconnected, so the reconnect
+        # loop opens the channel once a session exists.
+        self._closed.clear()
+        self.channel_enabled = True
+        if not self.session_id:
+            return False
+        for monitor in self.monitors:
+            if not self._session(monitor):
+                continue
+            thread = self._channel_threads.get(monitor)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._channel_loop, args=(monitor,), daemon=True)
+                self._channel_threads[monitor] = thread
+                thread.start()
+        return True
+
+    def close_channel(self):
+        self.channel_enabled = False
+        self.channel_open = False
+        self._closed.set()
+        self.thumbnails.stop()
+
+    def _channel_loop(self, monitor):
+        # Only the primary's channel carries count updates, so only it
+        # drives channel_open. The session is re-read on every attempt to
+        # pick up the one issued when the monitor re-registers.
+        primary = monitor == (self.key, self.name)
+        backoff = 1.0
+        stream_http = requests.Session()
+        while self.channel_enabled:
+            try:
+                with stream_http.get(f"{self.server_url}/channel", params={'session': self._session(monitor)},
+                                     stream=True, timeout=(5, 30), verify=True) as response:
+                    if response.status_code == 200:
+                        if primary:
+                            self.channel_open = True
+                        backoff = 1.0
+                        for line in response.iter_lines():
+                            if not self.channel_enabled:
+                                break
+                            if line:
+                                self._dispatch_command(json.loads(line), monitor)
+                    else:
+                        # Session no longer valid: re-register, counts fall back
+                        # to /update_count until the channel is back.
+                        print(f"Channel rejected: {response.status_code} ({monitor[1]})")
+                        self._set_disconnected(*monitor)
+            except Exception as e:
+                print(f"Channel error: {e}")
+            if primary:
+                self.channel_open = False
+            if self.channel_enabled:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+        if primary:
+            self.channel_open = False
+
+    def _upload_thumbnail(self, monitor, image, content_type):
+        # Runs on the encoder thread. The image goes up as a raw multipart
+        # file, identified by the channel session when there is one.
+        key, name = monitor
+        session = self._session(monitor)
+        if session:
+            form = {'session': session}
+        else:
+            form = {'key': key, 'name': name}
+        try:
+            response = self.thumbnail_http.post(f"{self.server_url}/thumbnail", data=form, timeout=self.timeout, verify=True,
+                                                files={'image': ('thumbnail', image, content_type)})
+            if response.status_code == 200:
+                return True
+            print(f"Error sending thumbnail: {response.status_code} - {response.text}")
+        except Exception as e:
+            print(f"Error while sending thumbnail: {e}")
+        return False
+
+    def send_people_count(self, people_count, frame=None, key=None, name=None, counters=None):
+        # people_count may be a callable; the channel reads it only after the
+        # epoch is fixed, so a concurrent reset can't pair an old count with it.
+        # counters: optional {line or zone name: {"in", "out", ...}} totals.
+        key = key or self.key
+        name = name or self.name
+        if not self.connected or (key, name) in self.lost_monitors:
+            self._buffer_sample(key, name, people_count)
+            return False
+        if frame is not None:
+            self.thumbnails.submit((key, name), frame)
+        if self.channel_open and self.batch_size <= 1 and (key, name) == (self.key, self.name):
+            return self._push_people_count(people_count, counters)
+        if callable(people_count):
+            people_count = people_count()
+        if self.batch_size > 1:
+            return self._queue_people_count(key, name, people_count, counters)
+        data = {'key': key, 'name': name, 'people_count': people_count}
+        if counters is not None:
+            data['counters'] = counters
         try:
             headers = {"Content-Type": "application/json"}
-            response = requests.post(f"{self.server_url}/update_count", json=data, headers=headers, verify=True)
+            response = self.http.post(f"{self.server_url}/update_count", json=data, headers=headers,
+                                      timeout=self.timeout, verify=True)
             if response.status_code == 200:
                 try:
                     resp_data = response.json()
-                    if resp_data.get("action") == "Reset Counter" and hasattr(self, 'app'):
-                        Clock.schedule_once(lambda dt: setattr(self.app, 'people_count', 0))
+                    if resp_data.get("action") == "Reset Counter":
+                        self._handle_reset(key, name, resp_data.get("epoch"))
                 except Exception as e:
                     print("Error processing JSON response:", e)
                 return True
             print(f"Error sending data: {response.status_code} - {response.text}")
+            if self._lost_registration(response):
+                if response.status_code == 403:
+                    self._set_disconnected(key, name)
+                else:
+                    self._set_disconnected()
+                self._buffer_sample(key, name, people_count)
+            return False
+        except Exception as e:
+            print(f"Error while sending data: {e}")
+            self._set_disconnected()
+            self._buffer_sample(key, name, people_count)
+            return False
+
+    def _push_people_count(self, people_count, counters=None):
+        epoch = self.epoch
+        if callable(people_count):
+            people_count = people_count()
+        now = time.time()
+        absolute = self.last_sent_count is None or now - self.last_push_time >= self.keepalive_interval
+        value = people_count if absolute else people_count - self.last_sent_count
+        # Counters are only sent when they change; the binary frame has no room
+        # for them, so such updates go out as JSON.
+        send_counters = counters is not None and (absolute or counters != self.last_sent_counters)
+        if not absolute and not value and not send_counters:
+            return True
+        binary = self.wire_format == "binary" and not send_counters
+        if binary:
+            body = wire.encode_count(self.session_id, epoch, value, absolute)
+            request_args = {'data': body, 'headers': {"Content-Type": wire.MIMETYPE}}
+        else:
+            data = {'s': self.session_id, 'e': epoch, 'c' if absolute else 'd': value}
+            if send_counters:
+                data['l'] = counters
+            request_args = {'json': data}
+        try:
+            response = self.http.post(f"{self.server_url}/channel", timeout=self.timeout, verify=True, **request_args)
+            if response.status_code == 200:
+                self.last_sent_count = people_count
+                self.last_push_time = now
+                if send_counters:
+                    self.last_sent_counters = counters
+                if binary:
+                    epoch = wire.decode_reply(response.content)
+                else:
+                    epoch = response.json().get("e", self.epoch)
+                if epoch != self.epoch:
+                    # The reset command was missed on the stream, apply it now.
+                    self._dispatch_command({"action": "Reset Counter", "epoch": epoch})
+                return True
+            print(f"Error sending data: {response.status_code} - {response.text}")
+            # Whether the server applied the delta is unknown, so the next
+            # update is sent as an absolute count.
+            self.last_sent_count = None
+            if self._lost_registration(response):
+                self.channel_open = False
+                self._set_disconnected()
+                self._buffer_sample(self.key, self.name, people_count)
+            return False
+        except Exception as e:
+            self.channel_open = False
+            self.last_sent_count = None
+            print(f"Error while sending data: {e}")
+            self._buffer_sample(self.key, self.name, people_count)
+            return False
+
+    def _queue_people_count(self, key, name, people_count, counters=None):
+        record = {'key': key, 'name': name, 'people_count': people_count, 'ts': time.time()}
+        if counters is not None:
+            record['counters'] = counters
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            return self.flush()
+        return True
+
+    def flush(self):
+        if not self.pending:
+            return True
+        records, self.pending = self.pending, []
+        try:
+            response = self.http.post(f"{self.server_url}/update_counts", json={'records': records},
+                                      timeout=self.timeout, verify=True)
+            if response.status_code == 200:
+                try:
+                    for record, result in zip(records, response.json().get("results", [])):
+                        if result and result.get("action") == "Reset Counter":
+                            self._handle_reset(result.get("key"), result.get("name"), result.get("epoch"))
+                        elif result and result.get("message") == "Client not connected":
+                            self._set_disconnected(record['key'], record['name'])
+                            self._buffer_sample(record['key'], record['name'], record['people_count'])
+                except Exception as e:
+                    print("Error processing JSON response:", e)
+                return True
+            print(f"Error sending data: {response.status_code} - {response.text}")
+            if self._lost_registration(response):
+                self._set_disconnected()
+                for record in records:
+                    self._buffer_sample(record['key'], record['name'], record['people_count'])
             return False
         except Exception as e:
-            self.connected = False
             print(f"Error while sending data: {e}")
-            return False
\ No newline at end of file
+            self._set_disconnected()
+            for record in records:
+                self._buffer_sample(record['key'], record['name'], record['people_count'])
+            return False
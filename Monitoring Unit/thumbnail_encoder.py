@@ -0,0 +1,98 @@
+import threading
+import time
+import cv2
+import numpy as np
+
+# format -> (cv2.imencode extension, quality flag, content type)
+FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY, "image/jpeg"),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY, "image/webp"),
+}
+
+class ThumbnailEncoder:
+    # Resizes and encodes thumbnails on a background thread and hands the
+    # bytes to on_encoded(monitor, data, content_type), which returns whether
+    # they were delivered. submit() never blocks: frames arriving less than
+    # `interval` seconds after the last accepted one for a monitor are
+    # ignored, and only the newest waiting frame per monitor is kept. Frames
+    # whose 32x18 grayscale signature differs from the last delivered one by
+    # less than `min_change` (mean absolute difference, 0-255) are skipped,
+    # unless that thumbnail is older than `max_age` seconds.
+    def __init__(self, on_encoded, interval=2.0, width=320, image_format="jpeg", quality=80, flip=None,
+                 min_change=2.0, max_age=60.0):
+        if image_format not in FORMATS:
+            raise ValueError(f"Unknown thumbnail format '{image_format}', expected one of {', '.join(FORMATS)}")
+        self.on_encoded = on_encoded
+        self.interval = interval
+        self.width = width
+        self.extension, quality_flag, self.content_type = FORMATS[image_format]
+        self.params = [quality_flag, quality]
+        # cv2.flip code applied after resizing, for callers that don't flip frames themselves.
+        self.flip = flip
+        self.min_change = min_change
+        self.max_age = max_age
+        self.cond = threading.Condition()
+        self.pending = {}
+        self.accepted = {}
+        # monitor -> (signature, delivered at) of the last delivered thumbnail
+        self.delivered = {}
+        self.stats = {"encoded": 0, "skipped": 0, "failed": 0}
+        self._stopped = False
+        self._thread = None
+
+    def submit(self, monitor, frame):
+        # The frame is read later on the encoder thread, so callers must not
+        # modify it afterwards.
+        now = time.monotonic()
+        if now - self.accepted.get(monitor, -self.interval) < self.interval:
+            return False
+        self.accepted[monitor] = now
+        with self.cond:
+            self.pending[monitor] = frame
+            self._stopped = False
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self.cond.notify()
+        return True
+
+    def stop(self):
+        with self.cond:
+            self._stopped = True
+            self.pending.clear()
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self._stopped:
+                    self.cond.wait()
+                if self._stopped:
+                    return
+                monitor, frame = self.pending.popitem()
+            try:
+                self._encode(monitor, frame)
+            except Exception as e:
+                print(f"Thumbnail error: {e}")
+
+    def _encode(self, monitor, frame):
+        height = max(1, int(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        signature = cv2.resize(gray, (32, 18), interpolation=cv2.INTER_AREA).astype(np.int16)
+        now = time.monotonic()
+        last = self.delivered.get(monitor)
+        if last is not None and now - last[1] < self.max_age and \
+                np.abs(signature - last[0]).mean() < self.min_change:
+            self.stats["skipped"] += 1
+            return
+        if self.flip is not None:
+            small = cv2.flip(small, self.flip)
+        success, encoded = cv2.imencode(self.extension, small, self.params)
+        if not success:
+            return
+        self.stats["encoded"] += 1
+        if self.on_encoded(monitor, encoded.tobytes(), self.content_type):
+            self.delivered[monitor] = (signature, now)
+        else:
+            self.stats["failed"] += 1
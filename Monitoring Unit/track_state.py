@@ -0,0 +1,98 @@
+import numpy as np
+
+class TrackTable:
+    # Array-backed per-track state. Track ids map to reusable slots; tracks
+    # not seen for `ttl` frames are evicted and, when every slot is taken, the
+    # least recently seen track makes room. The table only grows when a single
+    # frame has more live tracks than slots, so memory stays flat however many
+    # ids the tracker hands out over the uptime.
+    def __init__(self, capacity=128, ttl=90, lines=0, zones=0):
+        self.ttl = ttl
+        self.slots = {}
+        self.free = list(range(capacity - 1, -1, -1))
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.last_seen = np.full(capacity, -1, dtype=np.int64)
+        # Last non-zero side per line, inside flags per zone and whether the
+        # zone flags hold a real placement yet.
+        self.sides = np.zeros((capacity, lines), dtype=np.int8)
+        self.inside = np.zeros((capacity, zones), dtype=bool)
+        self.placed = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return len(self.slots)
+
+    @property
+    def capacity(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.ids, self.last_seen, self.sides, self.inside, self.placed))
+
+    def lookup(self, track_ids, frame):
+        # Returns the slot of every id, allocating slots for new ones, and
+        # marks them as seen in this frame.
+        slots = np.empty(len(track_ids), dtype=np.intp)
+        for i, track_id in enumerate(track_ids):
+            slot = self.slots.get(track_id)
+            if slot is None:
+                slot = self._allocate(track_id, frame)
+            # Stamped right away so a later allocation in this frame can't take the slot.
+            self.last_seen[slot] = frame
+            slots[i] = slot
+        return slots
+
+    def _allocate(self, track_id, frame):
+        if not self.free:
+            used = np.flatnonzero((self.ids >= 0) & (self.last_seen >= 0) & (self.last_seen < frame))
+            if len(used):
+                self.release(used[np.argmin(self.last_seen[used])])
+            else:
+                self._grow()
+        slot = self.free.pop()
+        self.slots[track_id] = slot
+        self.ids[slot] = track_id
+        self.sides[slot] = 0
+        self.placed[slot] = False
+        return slot
+
+    def _grow(self):
+        capacity = self.capacity
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+        self.ids = np.concatenate([self.ids, np.full(capacity, -1, dtype=np.int64)])
+        self.last_seen = np.concatenate([self.last_seen, np.full(capacity, -1, dtype=np.int64)])
+        self.sides = np.concatenate([self.sides, np.zeros_like(self.sides)])
+        self.inside = np.concatenate([self.inside, np.zeros_like(self.inside)])
+        self.placed = np.concatenate([self.placed, np.zeros_like(self.placed)])
+
+    def release(self, slot):
+        del self.slots[int(self.ids[slot])]
+        self.ids[slot] = -1
+        self.last_seen[slot] = -1
+        self.free.append(int(slot))
+
+    def evict(self, frame):
+        expired = np.flatnonzero((self.ids >= 0) & (frame - self.last_seen > self.ttl))
+        for slot in expired:
+            self.release(slot)
+        return len(expired)
+
+    def clear(self):
+        self.slots.clear()
+        self.free = list(range(self.capacity - 1, -1, -1))
+        self.ids.fill(-1)
+        self.last_seen.fill(-1)
+
+    def add_line(self):
+        self.sides = np.concatenate([self.sides, np.zeros((self.capacity, 1), dtype=np.int8)], axis=1)
+
+    def reset_line(self, index):
+        self.sides[:, index] = 0
+
+    def remove_line(self, index):
+        self.sides = np.delete(self.sides, index, axis=1)
+
+    def add_zone(self):
+        self.inside = np.concatenate([self.inside, np.zeros((self.capacity, 1), dtype=bool)], axis=1)
+        # Tracks are re-placed against every zone on their next frame.
+        self.placed.fill(False)
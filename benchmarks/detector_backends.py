@@ -0,0 +1,72 @@
+"""Compare detector backends on CPU.
+
+Run from the repository root:
+    python benchmarks/detector_backends.py [model.pt] [image_or_video] [iterations]
+
+Exports the model to each backend (cached under exported_models/), then
+reports frames/s and per-frame latency for predict and track on the same
+input. Backends whose runtime is not installed are skipped.
+"""
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Monitoring Unit"))
+
+import cv2
+import numpy as np
+from detector import BACKENDS, load_detector
+
+def load_frames(path, count=60):
+    if path is None:
+        from ultralytics.utils import ASSETS
+        path = str(ASSETS / "bus.jpg")
+    image = cv2.imread(path)
+    if image is not None:
+        return [image]
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"Unable to read {path}")
+    return frames
+
+def measure(fn, frames, iterations, warmup=5):
+    for i in range(warmup):
+        fn(frames[i % len(frames)])
+    latencies = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        fn(frames[i % len(frames)])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def report(label, latencies):
+    p95 = float(np.percentile(latencies, 95))
+    print(f"{label:<18} {1000 / statistics.mean(latencies):7.1f} fps  "
+          f"mean {statistics.mean(latencies):7.2f} ms  p50 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms")
+
+def main(model_name="model.pt", source=None, iterations=100):
+    frames = load_frames(source)
+    for backend in BACKENDS:
+        try:
+            model = load_detector(model_name, backend, device='cpu')
+        except Exception as e:
+            print(f"{backend:<18} skipped: {e}")
+            continue
+        report(f"{backend} predict", measure(
+            lambda frame: model.predict(frame, classes=[0], device='cpu', verbose=False), frames, iterations))
+        report(f"{backend} track", measure(
+            lambda frame: model.track(frame, persist=True, tracker="bytetrack.yaml", classes=[0],
+                                      device='cpu', verbose=False), frames, iterations))
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "model.pt",
+         sys.argv[2] if len(sys.argv) > 2 else None,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 100)
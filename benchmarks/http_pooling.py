@@ -0,0 +1,145 @@
+"""Compare per-call requests with a pooled keep-alive session.
+
+Run from the repository root:
+    python benchmarks/http_pooling.py [requests] [threads] [--tls]
+
+Serves the controller's Flask app on a local port and sends count updates
+to POST /update_count, first with module-level requests.post (a new
+connection per call, as before), then with the pooled session that
+ServerConnector and ApiClient now share across calls. With --tls the
+server uses a self-signed certificate (needs the cryptography package),
+which shows the handshake cost.
+
+werkzeug's development server closes every connection, so the app is
+served by a minimal HTTP/1.1 WSGI handler here, standing in for uWSGI
+with http-keepalive.
+"""
+import io
+import os
+import sys
+import time
+import logging
+import tempfile
+import threading
+import statistics
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "Controller Server"))
+sys.path.insert(0, os.path.join(ROOT, "Monitoring Unit"))
+sys.path.append(ROOT)
+os.environ.setdefault("SMARTFLOW_LIVE_STATE", "memory")
+
+import requests
+from settings import SettingsManager
+from monitor import MonitorManager
+from flask_server import FlaskServer
+from shared.http_session import create_session
+
+# The --tls certificate is self-signed.
+warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    app = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        path, _, query = self.path.partition("?")
+        environ = {
+            "REQUEST_METHOD": self.command, "PATH_INFO": path, "QUERY_STRING": query,
+            "CONTENT_TYPE": self.headers.get("Content-Type", ""), "CONTENT_LENGTH": str(length),
+            "SERVER_NAME": "127.0.0.1", "SERVER_PORT": str(self.server.server_port),
+            "SERVER_PROTOCOL": self.request_version, "REMOTE_ADDR": self.client_address[0],
+            "wsgi.input": io.BytesIO(self.rfile.read(length)), "wsgi.errors": sys.stderr,
+            "wsgi.version": (1, 0), "wsgi.url_scheme": self.server.scheme, "wsgi.multithread": True,
+            "wsgi.multiprocess": False, "wsgi.run_once": False,
+        }
+        for name, value in self.headers.items():
+            environ["HTTP_" + name.upper().replace("-", "_")] = value
+        response = []
+
+        def start_response(status, headers, exc_info=None):
+            response[:] = [status, headers]
+
+        result = self.app(environ, start_response)
+        try:
+            body = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        status, headers = response
+        code, _, reason = status.partition(" ")
+        self.send_response(int(code), reason)
+        for name, value in headers:
+            if name.lower() not in ("content-length", "connection"):
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+def serve(app, tls=False):
+    handler = type("AppHandler", (KeepAliveHandler,), {"app": staticmethod(app)})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.scheme = "http"
+    if tls:
+        from werkzeug.serving import generate_adhoc_ssl_context
+        server.socket = generate_adhoc_ssl_context().wrap_socket(server.socket, server_side=True)
+        server.scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def measure(post, url, total, threads):
+    body = {'key': "benchkey", 'name': "bench", 'people_count': 1}
+
+    def send(i):
+        response = post(url, json=body, timeout=5, verify=False)
+        assert response.status_code == 200, response.text
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(send, range(total)))
+    return total / (time.perf_counter() - start)
+
+def main(total=2000, threads=1, tls=False, rounds=5):
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        settings_manager = SettingsManager(db_name)
+        monitor_manager = MonitorManager(db_name)
+        monitor_manager.add_monitor({"name": "bench", "key": "benchkey"})
+        server = FlaskServer(settings_manager, monitor_manager)
+        http_server = serve(server.app, tls)
+        base_url = f"{http_server.scheme}://127.0.0.1:{http_server.server_port}"
+        try:
+            requests.post(f"{base_url}/connect", json={'key': "benchkey", 'name': "bench"}, timeout=5, verify=False)
+            url = f"{base_url}/update_count"
+            session = create_session(pool_size=threads)
+            variants = {"requests.post per call": requests.post, "pooled keep-alive session": session.post}
+            rates = {label: [] for label in variants}
+            # Alternating rounds so both variants see the same background load.
+            for _ in range(rounds):
+                for label, post in variants.items():
+                    rates[label].append(measure(post, url, max(1, total // rounds), threads))
+            print(f"{total} updates to {url}, {threads} thread(s), median of {rounds} rounds")
+            for label, values in rates.items():
+                rate = statistics.median(values)
+                print(f"{label:<28} {rate:8.0f} req/s  {1e3 / rate:6.2f} ms/req")
+            before, after = (statistics.median(values) for values in rates.values())
+            print(f"speedup: {after / before:.2f}x")
+        finally:
+            http_server.shutdown()
+            server.history.stop()
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--tls"]
+    main(int(args[0]) if args else 2000, int(args[1]) if len(args) > 1 else 1, tls="--tls" in sys.argv)
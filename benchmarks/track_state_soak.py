@@ -0,0 +1,111 @@
+"""Soak test for the Monitoring Unit's track state.
+
+Run from the repository root:
+    python benchmarks/track_state_soak.py [frames] [people_per_frame]
+
+Simulates a busy entrance: people walk across the boundary and every one of
+them gets a fresh ByteTrack id, as in a long-running deployment. Feeds the
+tracks to CountingEngine and to the old unbounded per-id dict, and reports
+the traced Python memory of both as the number of ids seen grows. The
+default 108000 frames is an hour at 30 fps; pass 2592000 for a full day.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Monitoring Unit"))
+
+import numpy as np
+from counting import CountingEngine, line_side, crossing_delta
+from track_state import TrackTable
+
+LINE = [(320.0, 0.0), (320.0, 480.0)]
+
+class Crowd:
+    # people_per_frame walkers crossing the frame from left to right in
+    # walk_frames frames; each new walker takes the next track id.
+    def __init__(self, people_per_frame, walk_frames=90):
+        self.walk_frames = walk_frames
+        self.ids = np.arange(people_per_frame, dtype=np.int64)
+        self.age = np.linspace(0, walk_frames, people_per_frame, endpoint=False).astype(np.int64)
+        self.y = np.random.default_rng(0).uniform(40, 440, people_per_frame).astype(np.float32)
+        self.next_id = people_per_frame
+
+    def step(self):
+        self.age += 1
+        done = self.age >= self.walk_frames
+        count = int(np.count_nonzero(done))
+        if count:
+            self.ids[done] = np.arange(self.next_id, self.next_id + count)
+            self.age[done] = 0
+            self.next_id += count
+        x = 10 + self.age * (620.0 / self.walk_frames)
+        return self.ids, np.stack([x, self.y], axis=1)
+
+def unbounded_counter():
+    # The previous main.py logic: a dict that remembers every id ever seen.
+    prev_sides = {}
+    total = [0]
+
+    def update(track_ids, centroids):
+        for track_id, point in zip(track_ids.tolist(), centroids.tolist()):
+            side = line_side(LINE, point)
+            total[0] += crossing_delta(prev_sides.get(track_id), side)
+            if side:
+                prev_sides[track_id] = side
+        return total[0]
+    return update, lambda: len(prev_sides)
+
+def bounded_counter():
+    engine = CountingEngine()
+    engine.set_line("main", LINE)
+    total = [0]
+
+    def update(track_ids, centroids):
+        total[0] += engine.update(track_ids, centroids)["main"]
+        return total[0]
+    return update, lambda: len(engine.tracks)
+
+def check_full_table():
+    # A full table must not hand a live track's slot to another id in the
+    # same frame; it evicts an older track or grows instead.
+    table = TrackTable(capacity=2)
+    table.lookup([1, 2], 1)
+    slots = table.lookup([1, 3], 2)
+    assert len(set(slots.tolist())) == 2 and table.slots == {1: slots[0], 3: slots[1]}, slots
+    table = TrackTable(capacity=2)
+    slots = table.lookup([1, 2, 3], 1)
+    assert len(set(slots.tolist())) == 3 and table.capacity == 4, slots
+
+def soak(name, factory, frames, people, checkpoints=8):
+    tracemalloc.start()
+    update, size = factory()
+    crowd = Crowd(people)
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    count = 0
+    print(f"{name}")
+    print(f"  {'frame':>10} {'ids seen':>10} {'state':>8} {'memory':>12}")
+    for frame in range(1, frames + 1):
+        count = update(*crowd.step())
+        if frame % (frames // checkpoints) == 0:
+            used = tracemalloc.get_traced_memory()[0] - baseline
+            print(f"  {frame:>10} {crowd.next_id:>10} {size():>8} {used / 1024:>9.1f} KiB")
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    print(f"  counted {count} crossings, {elapsed / frames * 1e6:.1f} us/frame (traced)\n")
+    return count
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 108_000
+    people = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    check_full_table()
+    bounded = soak("CountingEngine (TrackTable, ttl=90)", bounded_counter, frames, people)
+    unbounded = soak("Unbounded prev_sides dict", unbounded_counter, frames, people)
+    if bounded != unbounded:
+        print(f"Count mismatch: {bounded} != {unbounded}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Compare JSON and binary count updates on POST /channel.
+
+Run from the repository root:
+    python benchmarks/wire_format.py [iterations]
+
+Measures the encode/decode cost of one count update in both formats and the
+full round trip through the Flask test client, without any network.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Controller Server"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("SMARTFLOW_LIVE_STATE", "memory")
+
+from shared import wire
+from settings import SettingsManager
+from monitor import MonitorManager
+from flask_server import FlaskServer
+
+def timed(label, iterations, fn):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / iterations * 1e6:8.2f} us/op")
+    return elapsed
+
+def main(iterations=20000):
+    session = "0123456789abcdef"
+
+    def json_codec(i):
+        body = json.dumps({'s': session, 'e': 3, 'd': 1}).encode()
+        data = json.loads(body)
+        return data['s'], data['e'], data.get('c'), data.get('d', 0)
+
+    def binary_codec(i):
+        body = wire.encode_count(session, 3, 1)
+        return wire.decode_count(body)
+
+    print(f"JSON frame: {len(json.dumps({'s': session, 'e': 3, 'd': 1}))} bytes, "
+          f"binary frame: {len(wire.encode_count(session, 3, 1))} bytes")
+    json_time = timed("codec json", iterations, json_codec)
+    binary_time = timed("codec binary", iterations, binary_codec)
+    print(f"codec speedup: {json_time / binary_time:.1f}x")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        settings_manager = SettingsManager(db_name)
+        monitor_manager = MonitorManager(db_name)
+        monitor_manager.add_monitor({"name": "bench", "key": "benchkey"})
+        server = FlaskServer(settings_manager, monitor_manager)
+        client = server.app.test_client()
+        session = client.post('/connect', json={'key': "benchkey", 'name': "bench"}).get_json()["session"]
+        requests_count = max(1, iterations // 10)
+
+        def post_json(i):
+            response = client.post('/channel', json={'s': session, 'e': 0, 'd': 1})
+            assert response.status_code == 200
+
+        def post_binary(i):
+            response = client.post('/channel', data=wire.encode_count(session, 0, 1),
+                                   content_type=wire.MIMETYPE)
+            assert response.status_code == 200
+
+        json_time = timed("POST /channel json", requests_count, post_json)
+        binary_time = timed("POST /channel binary", requests_count, post_binary)
+        print(f"request speedup: {json_time / binary_time:.2f}x")
+        server.history.stop()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -73,7 +73,9 @@ def build_app(app_name, main_file):
     cmd.append(main_file)
 
     try:
-        subprocess.run(cmd, check=True)
+        # Lets Nuitka find the shared/ package the apps import from the repository root.
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.abspath("."), os.getenv("PYTHONPATH")])))
+        subprocess.run(cmd, check=True, env=env)
         logging.info(f"[+] {app_name} built successfully!")
         move_and_cleanup_dist(output_dir, app_name)
     except Exception as e:
@@ -0,0 +1,16 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+def create_session(pool_size=4, retries=2, backoff_factor=0.3):
+    # Keep-alive session with a bounded connection pool. Connection failures
+    # are retried for every method since nothing reached the server; read
+    # errors and 502-504 only for idempotent methods, as count deltas must
+    # not be applied twice.
+    retry = Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=backoff_factor,
+                  status_forcelist=(502, 503, 504), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
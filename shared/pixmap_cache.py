@@ -0,0 +1,110 @@
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtGui import QImage, QPixmap
+from shiboken6 import isValid
+
+class PixmapCache(QObject):
+    # Decoded thumbnails keyed by (image hash, target width, target height).
+    # Decoding, flipping and scaling run on a thread pool; only the QPixmap
+    # conversion happens on the GUI thread. Least recently used pixmaps are
+    # evicted once they take more than max_bytes.
+    _decoded = Signal(object, object)
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_workers=2, flip=-1, parent=None):
+        super().__init__(parent)
+        self.max_bytes = max_bytes
+        # cv2.flip code applied after decoding, None to keep the image as sent.
+        self.flip = flip
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="pixmap")
+        self.pixmaps = OrderedDict()
+        self.size_bytes = 0
+        # key -> callbacks waiting for a decode that is already running
+        self.pending = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._decoded.connect(self._store)
+
+    def request(self, data, size, callback, image_hash=None):
+        # Returns the cached QPixmap scaled to fit size (a QSize), or None
+        # after scheduling the decode; callback(pixmap) then runs on the GUI
+        # thread, with None when the image can't be decoded.
+        if image_hash is None:
+            image_hash = hashlib.blake2b(data, digest_size=12).hexdigest()
+        pixmap = self.get(image_hash, size)
+        if pixmap is not None:
+            return pixmap
+        key = (image_hash, size.width(), size.height())
+        if key in self.pending:
+            self.pending[key].append(callback)
+        else:
+            self.pending[key] = [callback]
+            self.executor.submit(self._decode, key, bytes(data))
+        return None
+
+    def get(self, image_hash, size):
+        # Cached pixmap only, for callers that can skip loading the image bytes on a hit.
+        key = (image_hash, size.width(), size.height())
+        pixmap = self.pixmaps.get(key)
+        if pixmap is None:
+            self.stats["misses"] += 1
+            return None
+        self.pixmaps.move_to_end(key)
+        self.stats["hits"] += 1
+        return pixmap
+
+    def _decode(self, key, data):
+        try:
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            image = None if frame is None else self._to_image(frame, key[1], key[2])
+        except Exception as e:
+            print(f"Error decoding image: {e}")
+            image = None
+        try:
+            self._decoded.emit(key, image)
+        except RuntimeError:
+            # The cache was deleted with its window while decoding.
+            pass
+
+    def _to_image(self, frame, width, height):
+        if self.flip is not None:
+            frame = cv2.flip(frame, self.flip)
+        scale = min(width / frame.shape[1], height / frame.shape[0])
+        if scale != 1:
+            size = (max(1, round(frame.shape[1] * scale)), max(1, round(frame.shape[0] * scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        frame = np.ascontiguousarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        height, width = frame.shape[:2]
+        # QImage doesn't own frame's memory, copy() detaches it before frame goes away.
+        return QImage(frame.data, width, height, 3 * width, QImage.Format_RGB888).copy()
+
+    def _store(self, key, image):
+        pixmap = None
+        if image is not None:
+            pixmap = QPixmap.fromImage(image)
+            self.pixmaps[key] = pixmap
+            self.size_bytes += self._cost(pixmap)
+            # The newest pixmap stays even when it alone is over the budget.
+            while self.size_bytes > self.max_bytes and len(self.pixmaps) > 1:
+                _, evicted = self.pixmaps.popitem(last=False)
+                self.size_bytes -= self._cost(evicted)
+                self.stats["evictions"] += 1
+        for callback in self.pending.pop(key, []):
+            # Skip widgets that were closed while the image was decoding.
+            owner = getattr(callback, "__self__", None) or getattr(getattr(callback, "func", None), "__self__", None)
+            if isinstance(owner, QObject) and not isValid(owner):
+                continue
+            callback(pixmap)
+
+    @staticmethod
+    def _cost(pixmap):
+        return pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+
+    def clear(self):
+        self.pixmaps.clear()
+        self.size_bytes = 0
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
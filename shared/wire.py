@@ -0,0 +1,34 @@
+import struct
+
+# Compact binary count update for POST /channel, an alternative to the JSON
+# {s, e, d | c, i} frame. Layout, network byte order:
+#   session  8 bytes  the /connect session id (hex decoded)
+#   epoch    uint32   reset epoch the count belongs to
+#   flags    uint8    FLAG_ABSOLUTE: value is the count, otherwise a delta
+#   value    int32    people count or delta
+#   image    rest     optional raw thumbnail bytes (JPEG/WebP)
+# The reply is a bare uint32 carrying the current epoch.
+MIMETYPE = "application/x-smartflow-count"
+COUNT_FRAME = struct.Struct("!8sIBi")
+COUNT_REPLY = struct.Struct("!I")
+FLAG_ABSOLUTE = 0x01
+
+def encode_count(session, epoch, value, absolute=False, image=None):
+    frame = COUNT_FRAME.pack(bytes.fromhex(session), epoch, FLAG_ABSOLUTE if absolute else 0, value)
+    return frame + image if image else frame
+
+def decode_count(body):
+    # Returns (session, epoch, count, delta, image); raises ValueError when malformed.
+    if len(body) < COUNT_FRAME.size:
+        raise ValueError("Count frame too short")
+    session, epoch, flags, value = COUNT_FRAME.unpack_from(body)
+    image = body[COUNT_FRAME.size:] or None
+    if flags & FLAG_ABSOLUTE:
+        return session.hex(), epoch, value, 0, image
+    return session.hex(), epoch, None, value, image
+
+def encode_reply(epoch):
+    return COUNT_REPLY.pack(epoch)
+
+def decode_reply(body):
+    return COUNT_REPLY.unpack(body[:COUNT_REPLY.size])[0]